@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Analysis
+from .models import Analysis, AnalysisBatch, AnalysisJob
 
 
 @admin.register(Analysis)
@@ -22,4 +22,19 @@ class AnalysisAdmin(admin.ModelAdmin):
     )
     
     def has_add_permission(self, request):
-        return False  # Analyses should be created programmatically
\ No newline at end of file
+        return False  # Analyses should be created programmatically
+
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'analysis', 'status', 'priority', 'attempts', 'lease_owner', 'leased_until', 'created_at']
+    list_filter = ['status', 'priority', 'created_at']
+    search_fields = ['repo_url', 'lease_owner', 'id']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(AnalysisBatch)
+class AnalysisBatchAdmin(admin.ModelAdmin):
+    list_display = ['id', 'requested_count', 'created_at']
+    readonly_fields = ['created_at']
+    filter_horizontal = ['analyses']
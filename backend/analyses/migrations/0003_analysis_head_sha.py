@@ -0,0 +1,22 @@
+# Generated by Django 4.2.11 on 2026-10-17 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyses', '0002_analysis_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysis',
+            name='head_sha',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='analysis',
+            index=models.Index(fields=['repository', 'head_sha'], name='analyses_reposit_1cb5b1_idx'),
+        ),
+    ]
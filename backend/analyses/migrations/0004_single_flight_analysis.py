@@ -0,0 +1,41 @@
+# Generated by Django 4.2.11 on 2026-10-17 23:03
+
+from django.db import migrations, models
+
+
+def fail_duplicate_in_flight_analyses(apps, schema_editor):
+    """
+    Fail pending/processing analyses left behind by the old in-process
+    threads (they have no job, so nothing would ever run them), then keep
+    only the newest queued one per repository.
+    """
+    Analysis = apps.get_model('analyses', 'Analysis')
+    Analysis.objects.filter(status__in=['pending', 'processing'], job__isnull=True).update(
+        status='failed',
+        error_message='Interrupted before the job queue was introduced'
+    )
+
+    seen = set()
+    in_flight = Analysis.objects.filter(status__in=['pending', 'processing']).order_by('repository_id', '-created_at')
+    for analysis in in_flight.only('id', 'repository_id'):
+        if analysis.repository_id in seen:
+            Analysis.objects.filter(id=analysis.id).update(
+                status='failed',
+                error_message='Superseded by a concurrent analysis of the same repository'
+            )
+        seen.add(analysis.repository_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyses', '0003_analysis_head_sha'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_in_flight_analyses, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='analysis',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'processing'])), fields=('repository',), name='unique_in_flight_analysis_per_repository'),
+        ),
+    ]
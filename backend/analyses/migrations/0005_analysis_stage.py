@@ -0,0 +1,26 @@
+# Generated by Django 4.2.11 on 2026-10-17 23:18
+
+from django.db import migrations, models
+
+
+def backfill_stage(apps, schema_editor):
+    """Finished analyses start out in their terminal stage"""
+    Analysis = apps.get_model('analyses', 'Analysis')
+    Analysis.objects.filter(status='completed').update(stage='completed')
+    Analysis.objects.filter(status='failed').update(stage='failed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyses', '0004_single_flight_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysis',
+            name='stage',
+            field=models.CharField(choices=[('queued', 'Queued'), ('github_fetch', 'Fetching repository'), ('sampling', 'Sampling files'), ('llm', 'Scoring personality'), ('persist', 'Saving results'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20),
+        ),
+        migrations.RunPython(backfill_stage, migrations.RunPython.noop),
+    ]
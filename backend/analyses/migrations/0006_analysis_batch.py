@@ -0,0 +1,49 @@
+# Generated by Django 4.2.11 on 2026-10-17 23:19
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyses', '0005_analysis_stage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisBatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('requested_count', models.IntegerField(default=0)),
+                ('invalid_urls', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'analysis_batches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='analysisjob',
+            options={'ordering': ['-priority', 'created_at']},
+        ),
+        migrations.RemoveIndex(
+            model_name='analysisjob',
+            name='analysis_jo_status_5eec4d_idx',
+        ),
+        migrations.AddField(
+            model_name='analysisjob',
+            name='priority',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='analysisjob',
+            index=models.Index(fields=['status', '-priority', 'created_at'], name='analysis_jo_status_8bad47_idx'),
+        ),
+        migrations.AddField(
+            model_name='analysisbatch',
+            name='analyses',
+            field=models.ManyToManyField(db_table='analysis_batch_items', related_name='batches', to='analyses.analysis'),
+        ),
+    ]
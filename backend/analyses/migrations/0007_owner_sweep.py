@@ -0,0 +1,28 @@
+# Generated by Django 4.2.11 on 2026-10-17 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyses', '0006_analysis_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisbatch',
+            name='filters',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='analysisbatch',
+            name='owner',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='analysisjob',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
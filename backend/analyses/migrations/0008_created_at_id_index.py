@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-17 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyses', '0007_owner_sweep'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analysis',
+            index=models.Index(fields=['created_at', 'id'], name='analyses_created_f9077a_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-17 23:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyses', '0008_created_at_id_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analysis',
+            index=models.Index(fields=['completed_at'], name='analyses_complet_e124c7_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def fail_orphaned_in_flight_analyses(apps, schema_editor):
+    """
+    Fail pending/processing analyses without a job. Jobs are queued in the
+    same transaction as their analysis, so these can only be leftovers of the
+    old in-process threads that 0004 kept; single-flight attached every new
+    request to them and the repository could never be analyzed again.
+    """
+    Analysis = apps.get_model('analyses', 'Analysis')
+    Analysis.objects.filter(status__in=['pending', 'processing'], job__isnull=True).update(
+        status='failed',
+        stage='failed',
+        error_message='Interrupted before the job queue was introduced',
+        completed_at=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyses', '0009_analysis_completed_at_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_orphaned_in_flight_analyses, migrations.RunPython.noop),
+    ]
@@ -12,14 +12,38 @@ class Analysis(models.Model):
         ('completed', 'Completed'),
         ('failed', 'Failed'),
     ]
+    IN_FLIGHT_STATUSES = ['pending', 'processing']
+
+    # Pipeline stages, pushed to clients as they happen (see api.events)
+    STAGE_CHOICES = [
+        ('queued', 'Queued'),
+        ('github_fetch', 'Fetching repository'),
+        ('sampling', 'Sampling files'),
+        ('llm', 'Scoring personality'),
+        ('persist', 'Saving results'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    STAGE_PROGRESS = {
+        'queued': 5,
+        'github_fetch': 15,
+        'sampling': 35,
+        'llm': 55,
+        'persist': 90,
+        'completed': 100,
+        'failed': 0,
+    }
+    TERMINAL_STAGES = ['completed', 'failed']
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     repository = models.ForeignKey(Repository, on_delete=models.CASCADE, related_name='analyses')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES, default='queued')
     error_message = models.TextField(blank=True, null=True)
     file_count = models.IntegerField(blank=True, null=True)
     line_count = models.IntegerField(blank=True, null=True)
     commit_count = models.IntegerField(blank=True, null=True)
+    head_sha = models.CharField(max_length=40, blank=True, null=True)  # Default-branch HEAD at analysis time
     top_languages = JSONField(default=dict, blank=True)  # {"python": 60, "javascript": 30}
     analysis_metadata = JSONField(default=dict, blank=True)  # Additional stats
     created_at = models.DateTimeField(auto_now_add=True)
@@ -31,12 +55,84 @@ class Analysis(models.Model):
         indexes = [
             models.Index(fields=['status']),
             models.Index(fields=['repository']),
+            models.Index(fields=['repository', 'head_sha']),
+            models.Index(fields=['created_at', 'id']),  # Keyset pagination
+            models.Index(fields=['completed_at']),  # Incremental similarity index refresh
+        ]
+        constraints = [
+            # At most one pending/processing analysis per repository (single-flight)
+            models.UniqueConstraint(
+                fields=['repository'],
+                condition=models.Q(status__in=['pending', 'processing']),
+                name='unique_in_flight_analysis_per_repository',
+            ),
         ]
 
     def __str__(self):
         return f"Analysis {self.id} for {self.repository}"
 
+    @property
+    def progress(self) -> int:
+        return self.STAGE_PROGRESS.get(self.stage, 0)
+
     def save(self, *args, **kwargs):
         if self.status == 'completed' and not self.completed_at:
             self.completed_at = timezone.now()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class AnalysisBatch(models.Model):
+    """A group of analyses requested together (bulk analyze or an owner sweep)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    analyses = models.ManyToManyField(Analysis, related_name='batches', db_table='analysis_batch_items')
+    requested_count = models.IntegerField(default=0)
+    invalid_urls = JSONField(default=list, blank=True)  # [{"repo_url": ..., "error": ...}]
+    owner = models.CharField(max_length=255, blank=True, null=True)  # Set for organization / user sweeps
+    filters = JSONField(default=dict, blank=True)  # Sweep filters as requested
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'analysis_batches'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Analysis batch {self.id} ({self.requested_count} repositories)"
+
+
+class AnalysisJob(models.Model):
+    """Durable queue entry for an analysis, leased by worker processes"""
+    # Interactive requests go ahead of bulk fan-out in the shared queue
+    PRIORITY_BULK = 0
+    PRIORITY_INTERACTIVE = 10
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    analysis = models.OneToOneField(Analysis, on_delete=models.CASCADE, related_name='job')
+    repo_url = models.URLField(max_length=500)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    lease_owner = models.CharField(max_length=255, blank=True, null=True)
+    leased_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+    priority = models.IntegerField(default=0)  # Higher runs first
+    payload = JSONField(default=dict, blank=True)  # Data the enqueuer already had, e.g. {"repository": {...}}
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'analysis_jobs'
+        ordering = ['-priority', 'created_at']
+        indexes = [
+            models.Index(fields=['status', '-priority', 'created_at']),
+            models.Index(fields=['status', 'leased_until']),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} ({self.status}) for {self.repo_url}"
@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import GitHubTokenBudget
+
+
+@admin.register(GitHubTokenBudget)
+class GitHubTokenBudgetAdmin(admin.ModelAdmin):
+    list_display = ['fingerprint', 'remaining', 'rate_limit', 'reset_at', 'updated_at']
+    readonly_fields = ['fingerprint', 'updated_at']
@@ -0,0 +1,269 @@
+import json
+import queue
+import select
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Set
+from django.db import connection
+from analyses.models import Analysis
+
+
+def channel_for(analysis_id: str) -> str:
+    """Postgres NOTIFY channel of one analysis"""
+    return f"analysis_{str(analysis_id).replace('-', '')}"
+
+
+def publish(analysis_id: str, payload: Dict[str, Any]):
+    """
+    Notify listeners of an analysis through Postgres NOTIFY. Delivery happens
+    when the current transaction commits (immediately in autocommit), to
+    listeners in any process. Other databases have no pub/sub; their
+    listeners poll instead.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, %s)", [channel_for(analysis_id), json.dumps(payload)])
+
+
+def set_stage(analysis: Analysis, stage: str, **extra):
+    """Record a pipeline stage transition and push it to listeners"""
+    analysis.stage = stage
+    Analysis.objects.filter(id=analysis.id).update(stage=stage)
+    publish(analysis.id, dict(stage_payload(analysis), **extra))
+
+
+def stage_payload(analysis: Analysis) -> Dict[str, Any]:
+    return {
+        "analysis_id": str(analysis.id),
+        "stage": analysis.stage,
+        "status": analysis.status,
+        "progress": analysis.progress,
+    }
+
+
+def format_event(event: str, data: Dict[str, Any]) -> str:
+    """One server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# Queued to subscribers after the shared connection was re-established:
+# notifications may have been missed, so re-read the analysis
+RESYNC = object()
+
+
+class NotificationHub:
+    """
+    One LISTEN connection per process, shared by every event stream.
+
+    Channels are LISTENed while they have subscribers. A background thread
+    waits on the connection with select() and fans notifications out to
+    per-subscriber queues, so open streams cost no database connections of
+    their own. A dropped connection is re-opened after `reconnect_delay`.
+    """
+
+    def __init__(self, reconnect_delay: float = 1.0):
+        self.reconnect_delay = reconnect_delay
+        self.lock = threading.Lock()  # Guards the connection and subscribers
+        self.connection = None
+        self.subscribers: Dict[str, Set[queue.Queue]] = {}
+        self.thread = None
+
+    def subscribe(self, channel: str) -> queue.Queue:
+        """Queue of the channel's payloads; LISTEN is active once this returns"""
+        subscriber = queue.Queue()
+        with self.lock:
+            if self.connection is None:
+                self._open()
+            if channel not in self.subscribers:
+                with self.connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{channel}"')
+                self.subscribers[channel] = set()
+            self.subscribers[channel].add(subscriber)
+            self._dispatch()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="analysis-event-listener", daemon=True)
+                self.thread.start()
+        return subscriber
+
+    def unsubscribe(self, channel: str, subscriber: queue.Queue):
+        with self.lock:
+            subscribers = self.subscribers.get(channel)
+            if subscribers is None:
+                return
+            subscribers.discard(subscriber)
+            if subscribers:
+                return
+            del self.subscribers[channel]
+            if self.connection is not None:
+                try:
+                    with self.connection.cursor() as cursor:
+                        cursor.execute(f'UNLISTEN "{channel}"')
+                except Exception:
+                    pass  # The listener thread notices the broken connection and reconnects
+
+    def _open(self):
+        """Connect and LISTEN on every subscribed channel (lock held)"""
+        # Outside Django's per-thread connections, so LISTEN state never leaks into requests
+        listen_connection = connection.get_new_connection(connection.get_connection_params())
+        listen_connection.autocommit = True
+        with listen_connection.cursor() as cursor:
+            for channel in self.subscribers:
+                cursor.execute(f'LISTEN "{channel}"')
+        self.connection = listen_connection
+        for subscribers in self.subscribers.values():
+            for subscriber in subscribers:
+                subscriber.put(RESYNC)
+
+    def _dispatch(self):
+        """Hand queued notifications to subscribers (lock held)"""
+        while self.connection.notifies:
+            notify = self.connection.notifies.pop(0)
+            payload = json.loads(notify.payload)
+            for subscriber in self.subscribers.get(notify.channel, ()):
+                subscriber.put(payload)
+
+    def _run(self):
+        while True:
+            listen_connection = self.connection
+            try:
+                if listen_connection is None:
+                    raise ConnectionError("not connected")
+                # Time out now and then: a LISTEN issued by a subscriber may have read pending input
+                readable = select.select([listen_connection], [], [], 5)[0]
+                with self.lock:
+                    if readable:
+                        listen_connection.poll()
+                    self._dispatch()
+            except Exception as e:
+                if listen_connection is not None:
+                    print(f"Warning: Event listener connection lost: {str(e)}")
+                time.sleep(self.reconnect_delay)
+                self._reconnect(listen_connection)
+
+    def _reconnect(self, broken):
+        with self.lock:
+            if self.connection is not broken:
+                return  # Already replaced by a subscriber
+            try:
+                if broken is not None:
+                    broken.close()
+            except Exception:
+                pass
+            self.connection = None
+            try:
+                self._open()
+            except Exception as e:
+                print(f"Warning: Could not reconnect event listener: {str(e)}")
+
+
+_default_hub = None
+_default_hub_lock = threading.Lock()
+
+
+def get_default_notification_hub() -> NotificationHub:
+    """Process-wide notification hub"""
+    global _default_hub
+
+    with _default_hub_lock:
+        if _default_hub is None:
+            _default_hub = NotificationHub()
+        return _default_hub
+
+
+class AnalysisListener:
+    """
+    Receives the stage notifications of one analysis.
+
+    On PostgreSQL it subscribes to the analysis channel on the process-wide
+    NotificationHub and blocks on its queue, so an idle stream costs no
+    queries and no connection. Elsewhere the analysis row is re-read every
+    `poll_interval` seconds.
+    """
+
+    def __init__(self, analysis_id: str, poll_interval: float = 1.0):
+        self.analysis_id = analysis_id
+        self.poll_interval = poll_interval
+        self.channel = channel_for(analysis_id)
+        self.hub = None
+        self.queue = None
+        self.last_stage = None
+
+        if connection.vendor == 'postgresql':
+            self.hub = get_default_notification_hub()
+            self.queue = self.hub.subscribe(self.channel)
+
+    def wait(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Next stage change, or None when `timeout` seconds pass without one"""
+        if self.queue is None:
+            return self._poll(timeout)
+
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                payload = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if payload is RESYNC:
+                # Transitions may have been missed while reconnecting
+                payload = self._poll(0)
+                if payload is None:
+                    continue
+            self.last_stage = payload["stage"]
+            return payload
+
+    def _poll(self, timeout: float) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            analysis = Analysis.objects.only('id', 'stage', 'status').filter(id=self.analysis_id).first()
+            if analysis is not None and analysis.stage != self.last_stage:
+                self.last_stage = analysis.stage
+                return stage_payload(analysis)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(self.poll_interval, remaining))
+
+    def close(self):
+        if self.queue is not None:
+            self.hub.unsubscribe(self.channel, self.queue)
+            self.queue = None
+
+
+def analysis_event_stream(analysis_id: str, render_result, max_seconds: float = 600,
+                          keepalive_seconds: float = 15) -> Iterator[str]:
+    """
+    Server-sent events for an analysis: the current stage, every stage
+    transition, then a final `result` (or `failed`) event, after which the
+    stream ends. `render_result(analysis)` produces the result payload.
+    """
+    listener = AnalysisListener(analysis_id)
+    try:
+        # Listening starts before the snapshot, so no transition falls in between
+        analysis = Analysis.objects.get(id=analysis_id)
+        listener.last_stage = analysis.stage
+        yield format_event("stage", stage_payload(analysis))
+
+        started = time.monotonic()
+        while analysis.stage not in Analysis.TERMINAL_STAGES:
+            if time.monotonic() - started > max_seconds:
+                # EventSource reconnects and picks up from the current stage
+                yield format_event("timeout", {"analysis_id": str(analysis_id)})
+                return
+            payload = listener.wait(keepalive_seconds)
+            if payload is None:
+                yield ": keepalive\n\n"
+                continue
+            analysis.stage = payload["stage"]
+            yield format_event("stage", payload)
+
+        analysis = Analysis.objects.select_related('repository').get(id=analysis_id)
+        if analysis.stage == 'completed':
+            yield format_event("result", render_result(analysis))
+        else:
+            yield format_event("failed", {"analysis_id": str(analysis_id), "error": analysis.error_message})
+    finally:
+        listener.close()
@@ -0,0 +1,239 @@
+import base64
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class GitMirrorError(ValueError):
+    """A git command against a mirror failed"""
+
+
+@contextmanager
+def mirror_lock(path: str, exclusive: bool, blocking: bool = True):
+    """
+    flock on the mirror's lock file: shared while reading, exclusive while
+    syncing or deleting. Yields False if non-blocking and already held.
+    """
+    with open(f"{path}.lock", "w") as lock_file:
+        flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(lock_file, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class GitMirror:
+    """Read-only access to one bare mirror on local disk"""
+
+    def __init__(self, path: str, git_binary: str = "git", timeout: float = 300):
+        self.path = path
+        self.git_binary = git_binary
+        self.timeout = timeout
+
+    def git(self, *args: str, input: Optional[bytes] = None) -> bytes:
+        try:
+            # Shared lock, so another process can't evict the mirror mid-read
+            with mirror_lock(self.path, exclusive=False):
+                if not os.path.isdir(self.path):
+                    raise GitMirrorError(f"git {args[0]} failed: mirror {self.path} was evicted")
+                result = subprocess.run(
+                    [self.git_binary, "--git-dir", self.path, *args],
+                    input=input,
+                    capture_output=True,
+                    timeout=self.timeout,
+                    check=True
+                )
+        except subprocess.CalledProcessError as e:
+            raise GitMirrorError(f"git {args[0]} failed: {e.stderr.decode('utf-8', 'replace').strip()}")
+        except subprocess.TimeoutExpired:
+            raise GitMirrorError(f"git {args[0]} timed out after {self.timeout}s")
+        return result.stdout
+
+    @property
+    def default_branch(self) -> str:
+        return self.git("symbolic-ref", "--short", "HEAD").decode("utf-8").strip()
+
+    def head_sha(self, ref: str = "HEAD") -> str:
+        return self.git("rev-parse", ref).decode("utf-8").strip()
+
+    def commit_count(self, ref: str = "HEAD") -> int:
+        return int(self.git("rev-list", "--count", ref).decode("utf-8").strip())
+
+    def list_blobs(self, ref: str = "HEAD") -> List[Dict[str, Any]]:
+        """Files of a tree as {"path", "size", "sha"}, like the GitHub trees API"""
+        blobs = []
+        for line in self.git("ls-tree", "-r", "-l", "-z", ref).split(b"\0"):
+            if not line:
+                continue
+            meta, path = line.split(b"\t", 1)
+            _, object_type, sha, size = meta.split()
+            if object_type != b"blob":
+                continue
+            blobs.append({
+                "path": path.decode("utf-8", "replace"),
+                "size": int(size) if size != b"-" else 0,
+                "sha": sha.decode("ascii")
+            })
+        return blobs
+
+    def read_files(self, paths: List[str], ref: str = "HEAD", max_file_bytes: int = 64 * 1024) -> Dict[str, bytes]:
+        """Read several files with one `git cat-file --batch` process"""
+        if not paths:
+            return {}
+        request = "".join(f"{ref}:{path}\n" for path in paths).encode("utf-8")
+        output = self.git("cat-file", "--batch=%(objecttype) %(objectsize)", input=request)
+
+        contents = {}
+        offset = 0
+        for path in paths:
+            header_end = output.index(b"\n", offset)
+            header = output[offset:header_end]
+            offset = header_end + 1
+            if header.endswith(b" missing") or header.endswith(b" ambiguous"):
+                continue
+            object_type, size = header.split()
+            size = int(size)
+            if object_type == b"blob":
+                contents[path] = output[offset:offset + min(size, max_file_bytes)]
+            offset += size + 1  # Content is followed by a newline
+        return contents
+
+    def iter_commits(self, max_count: int, ref: str = "HEAD") -> Iterator[Dict[str, Any]]:
+        """Yield commits newest first, shaped like GitHub commit objects"""
+        output = self.git("log", f"--max-count={max_count}", "--format=%H%x00%P%x00%an%x00%ae%x00%aI%x00%s", ref)
+        for line in output.decode("utf-8", "replace").splitlines():
+            sha, parents, name, email, date, subject = line.split("\0", 5)
+            yield {
+                "sha": sha,
+                "author": None,  # No GitHub login locally
+                "parents": [{"sha": parent} for parent in parents.split()],
+                "commit": {
+                    "author": {"name": name, "email": email, "date": date},
+                    "message": subject
+                }
+            }
+
+
+class GitMirrorCache:
+    """
+    Directory of bare `git clone --mirror` copies, one per remote.
+
+    The first analysis of a repository clones it; later ones only run an
+    incremental fetch. Total size is capped: least recently synced mirrors
+    are evicted first. Mirror directories are locked with flock (shared by
+    readers, exclusive while syncing or evicting), so several worker
+    processes can share a cache.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, git_binary: str = "git", timeout: float = 300):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.git_binary = git_binary
+        self.timeout = timeout
+        os.makedirs(self.directory, exist_ok=True)
+
+    def mirror_path(self, remote_url: str) -> str:
+        digest = hashlib.sha256(remote_url.encode("utf-8")).hexdigest()[:16]
+        name = re.sub(r"[^A-Za-z0-9._-]+", "-", remote_url.rstrip("/").split("/")[-1]).strip("-") or "repo"
+        if not name.endswith(".git"):
+            name += ".git"
+        return os.path.join(self.directory, f"{digest}-{name}")
+
+    def sync(self, remote_url: str, token: Optional[str] = None) -> GitMirror:
+        """Clone the remote on first use, otherwise fetch new objects into the existing mirror"""
+        path = self.mirror_path(remote_url)
+        env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+        if token and remote_url.startswith("https://"):
+            # Pass credentials through the environment so they never land in the mirror config
+            credentials = base64.b64encode(f"x-access-token:{token}".encode("utf-8")).decode("ascii")
+            env.update({
+                "GIT_CONFIG_COUNT": "1",
+                "GIT_CONFIG_KEY_0": "http.extraHeader",
+                "GIT_CONFIG_VALUE_0": f"Authorization: Basic {credentials}"
+            })
+
+        with mirror_lock(path, exclusive=True):
+            if os.path.isdir(path):
+                command = [self.git_binary, "--git-dir", path, "remote", "update", "--prune"]
+            else:
+                command = [self.git_binary, "clone", "--mirror", "--quiet", remote_url, path]
+            try:
+                subprocess.run(command, env=env, capture_output=True, timeout=self.timeout, check=True)
+            except subprocess.CalledProcessError as e:
+                raise GitMirrorError(f"Failed to sync mirror of {remote_url}: "
+                                     f"{e.stderr.decode('utf-8', 'replace').strip()}")
+            except subprocess.TimeoutExpired:
+                raise GitMirrorError(f"Syncing mirror of {remote_url} timed out after {self.timeout}s")
+            os.utime(path)  # Mark as recently used
+
+        self.evict(keep=path)
+        return GitMirror(path, self.git_binary, self.timeout)
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """Remove least recently synced mirrors until the cache fits in max_bytes"""
+        mirrors = []
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and entry.path != keep:
+                mirrors.append((entry.stat().st_mtime, self._directory_size(entry.path), entry.path))
+        total = sum(size for _, size, _ in mirrors) + (self._directory_size(keep) if keep else 0)
+
+        evicted = []
+        for _, size, path in sorted(mirrors):
+            if total <= self.max_bytes:
+                break
+            with mirror_lock(path, exclusive=True, blocking=False) as acquired:
+                if not acquired:
+                    continue  # Being synced or read by another worker
+                shutil.rmtree(path, ignore_errors=True)
+            try:
+                os.remove(f"{path}.lock")
+            except OSError:
+                pass
+            total -= size
+            evicted.append(path)
+        return evicted
+
+    def _directory_size(self, path: str) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    continue
+        return total
+
+
+_default_mirror_cache = None
+_default_mirror_cache_lock = threading.Lock()
+
+
+def get_default_mirror_cache() -> Optional[GitMirrorCache]:
+    """Process-wide mirror cache configured from Django settings (None when disabled)"""
+    global _default_mirror_cache
+    from django.conf import settings
+
+    if not settings.GITHUB_MIRROR_ENABLED:
+        return None
+
+    with _default_mirror_cache_lock:
+        if _default_mirror_cache is None:
+            _default_mirror_cache = GitMirrorCache(
+                settings.GITHUB_MIRROR_DIR,
+                settings.GITHUB_MIRROR_MAX_BYTES,
+                timeout=settings.GITHUB_MIRROR_TIMEOUT_SECONDS
+            )
+        return _default_mirror_cache
@@ -0,0 +1,154 @@
+import threading
+from typing import Any, Dict, Optional
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from .disk_cache import DiskLRUCache
+
+
+# Response headers worth keeping with a cached body
+STORED_HEADERS = ["Content-Type", "ETag", "Last-Modified", "Link"]
+
+# Headers of a 304 that describe the (empty) 304 body rather than the resource
+BODY_HEADERS = {"content-length", "content-encoding", "transfer-encoding", "content-type"}
+
+
+class ConditionalRequestCache:
+    """
+    Persistent store of GitHub responses keyed by URL, revalidated with
+    ETag / Last-Modified. GitHub answers unchanged resources with 304, which
+    does not count against the rate limit.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.store = DiskLRUCache(directory, max_bytes)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, url: str, accept: str) -> str:
+        return f"{accept} {url}"
+
+    def record(self, hit: bool):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.store.evictions
+            }
+
+
+class CachedSession(requests.Session):
+    """
+    requests.Session that serves GET requests through a ConditionalRequestCache.
+
+    Cached entries are revalidated with If-None-Match / If-Modified-Since; a 304
+    is turned back into a regular 200 response built from the stored body.
+    Streaming requests bypass the cache.
+    """
+
+    def __init__(self, cache: Optional[ConditionalRequestCache] = None):
+        super().__init__()
+        self.cache = cache
+        # Per-session counters, so one analysis can report its own savings
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.counter_lock = threading.Lock()
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        if self.cache is None or method.upper() != "GET" or kwargs.get("stream"):
+            return super().request(method, url, params=params, headers=headers, **kwargs)
+
+        full_url = requests.Request("GET", url, params=params).prepare().url
+        request_headers = CaseInsensitiveDict(self.headers)
+        request_headers.update(headers or {})
+        key = self.cache.key_for(full_url, request_headers.get("Accept", ""))
+
+        entry = self.cache.store.get(key)
+        conditional_headers = dict(headers or {})
+        if entry:
+            metadata, _ = entry
+            stored = metadata.get("headers", {})
+            if stored.get("ETag"):
+                conditional_headers["If-None-Match"] = stored["ETag"]
+            if stored.get("Last-Modified"):
+                conditional_headers["If-Modified-Since"] = stored["Last-Modified"]
+
+        response = super().request(method, url, params=params, headers=conditional_headers, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self.cache.record(hit=True)
+            with self.counter_lock:
+                self.cache_hits += 1
+            return self._response_from_cache(entry, response)
+
+        self.cache.record(hit=False)
+        with self.counter_lock:
+            self.cache_misses += 1
+        if response.status_code == 200 and ("ETag" in response.headers or "Last-Modified" in response.headers):
+            stored_headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+            try:
+                self.cache.store.set(key, {"url": full_url, "headers": stored_headers}, response.content)
+            except OSError as e:
+                print(f"Warning: Could not write GitHub cache entry: {str(e)}")
+        return response
+
+    def _response_from_cache(self, entry, not_modified: requests.Response) -> requests.Response:
+        metadata, body = entry
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = not_modified.url
+        response.request = not_modified.request
+        response.elapsed = not_modified.elapsed
+        # Fresh headers from the 304 (rate limit etc.) take precedence over stored ones
+        response.headers = CaseInsensitiveDict(metadata.get("headers", {}))
+        response.headers.update({
+            name: value for name, value in not_modified.headers.items()
+            if name.lower() not in BODY_HEADERS
+        })
+        response.headers["X-GitSoul-Cache"] = "hit"
+        response._content = body
+        response.encoding = get_encoding_from_headers(response.headers)
+        return response
+
+    def release_thread(self):
+        """Hook for helper threads that are about to finish using the session"""
+
+    def cache_stats(self) -> Dict[str, Any]:
+        total = self.cache_hits + self.cache_misses
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": round(self.cache_hits / total, 4) if total else 0.0
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[ConditionalRequestCache]:
+    """Process-wide cache configured from Django settings (None when disabled)"""
+    global _default_cache
+    from django.conf import settings
+
+    if not settings.GITHUB_HTTP_CACHE_ENABLED:
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ConditionalRequestCache(
+                settings.GITHUB_HTTP_CACHE_DIR,
+                settings.GITHUB_HTTP_CACHE_MAX_BYTES
+            )
+        return _default_cache
@@ -1,20 +1,57 @@
+import os
 import requests
 import re
-from typing import Dict, List, Any, Optional
-from urllib.parse import urlparse
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterator, List, Any, Optional
+from urllib.parse import parse_qs, urlparse
+from .git_mirror import GitMirror, GitMirrorCache
+from .github_cache import CachedSession, ConditionalRequestCache
+from .sampling import SampleSelector, languages_from_blobs
+
+
+def decode_sample(data: bytes) -> Optional[str]:
+    """
+    UTF-8 text of a file sample read up to a byte limit; a multi-byte
+    character cut off by the limit is dropped. None for binary or non
+    UTF-8 content.
+    """
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # Only an incomplete character at the very end is the limit's doing
+        if e.reason != "unexpected end of data" or e.end != len(data):
+            return None
+        return data[:e.start].decode("utf-8")
 
 
 class GitHubClient:
-    def __init__(self, github_token: str):
+    def __init__(self, github_token: str, cache: Optional[ConditionalRequestCache] = None,
+                 mirror_cache: Optional[GitMirrorCache] = None, token_pool: Optional["TokenPool"] = None):
         self.base_url = "https://api.github.com"
+        self.github_token = github_token
+        self.mirror_cache = mirror_cache
         self.headers = {
             "Authorization": f"token {github_token}",
             "Accept": "application/vnd.github.v3+json",
             "User-Agent": "GitSoul-MVP"
         }
-        self.session = requests.Session()
+        if token_pool is not None:
+            # Every request is routed to the token with the most budget (needs Django)
+            from .github_tokens import TokenPoolSession
+            self.session = TokenPoolSession(token_pool, cache)
+        else:
+            self.session = CachedSession(cache)
         self.session.headers.update(self.headers)
 
+    def cache_stats(self) -> Dict[str, Any]:
+        """Conditional-request cache hits/misses for requests made by this client"""
+        return self.session.cache_stats()
+
     def parse_github_url(self, repo_url: str) -> Dict[str, str]:
         """Parse GitHub URL to extract owner and repo name"""
         try:
@@ -40,39 +77,46 @@ class GitHubClient:
         except Exception as e:
             raise ValueError(f"Failed to parse GitHub URL: {str(e)}")
 
-    def fetch_repository(self, repo_url: str) -> Dict[str, Any]:
+    def clone_url(self, repo_url: str) -> str:
+        """Git remote for a repository URL; file:// remotes are used as-is"""
+        if repo_url.startswith("file://"):
+            return repo_url
+        parsed = self.parse_github_url(repo_url)
+        return f"https://github.com/{parsed['full_name']}.git"
+
+    def create_fetch_context(self, repo_url: str, commit_history_limit: int = 100,
+                             repository: Optional[Dict[str, Any]] = None) -> "RepositoryFetchContext":
+        """
+        Create a per-analysis context that fetches each GitHub resource at most once
+
+        `repository` seeds the repository metadata when the caller already has
+        it (e.g. from an owner listing), saving the /repos/{owner}/{repo} call.
+        """
+        context = RepositoryFetchContext(self, repo_url, commit_history_limit)
+        if repository:
+            context._repository = repository
+        return context
+
+    def get_json(self, path: str) -> Any:
+        """GET a GitHub API path and decode the JSON body"""
+        response = self.session.get(f"{self.base_url}{path}")
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_repository(self, repo_url: str, context: Optional["RepositoryFetchContext"] = None) -> Dict[str, Any]:
         """Fetch repository metadata"""
         try:
-            parsed = self.parse_github_url(repo_url)
-            owner = parsed["owner"]
-            repo = parsed["repo"]
-            
-            # Fetch repository metadata
-            repo_response = self.session.get(f"{self.base_url}/repos/{owner}/{repo}")
-            repo_response.raise_for_status()
-            repo_data = repo_response.json()
-            
-            # Fetch commit history
-            commits_response = self.session.get(f"{self.base_url}/repos/{owner}/{repo}/commits?per_page=10")
-            commits_response.raise_for_status()
-            commits_data = commits_response.json()
+            context = context or self.create_fetch_context(repo_url)
             
-            # Fetch languages
-            languages_response = self.session.get(f"{self.base_url}/repos/{owner}/{repo}/languages")
-            languages_response.raise_for_status()
-            languages_data = languages_response.json()
+            repo_data = context.repository
+            commits_data = context.commits
+            languages_data = context.languages
             
-            # Calculate commit count (actual total might be more)
-            commit_count = len(commits_data)
-            
-            # Get file structure from default branch
-            default_branch = repo_data.get("default_branch", "main")
-            tree_response = self.session.get(f"{self.base_url}/repos/{owner}/{repo}/git/trees/{default_branch}?recursive=1")
-            tree_response.raise_for_status()
-            tree_data = tree_response.json()
+            # True total from the pagination links, without downloading the history
+            commit_count = context.commit_count
             
             # Count files (exclude directories)
-            file_count = len([item for item in tree_data.get("tree", []) if item.get("type") == "blob"])
+            file_count = len(context.blobs)
             
             # Get top languages
             total_bytes = sum(languages_data.values()) if languages_data else 0
@@ -85,7 +129,9 @@ class GitHubClient:
             
             return {
                 "repository": repo_data,
+                "head_sha": commits_data[0].get("sha") if commits_data else None,
                 "commit_count": commit_count,
+                "commit_stats": context.commit_stats.as_dict(),
                 "file_count": file_count,
                 "top_languages": top_languages,
                 "languages_raw": languages_data,
@@ -98,7 +144,7 @@ class GitHubClient:
                 if status_code == 404:
                     raise ValueError(f"Repository not found: {repo_url}")
                 elif status_code == 403:
-                    raise ValueError("GitHub API rate limit exceeded")
+                    raise ValueError("GitHub API access forbidden or rate limit exceeded")
                 elif status_code == 401:
                     raise ValueError("Invalid GitHub token")
                 else:
@@ -108,10 +154,89 @@ class GitHubClient:
         except Exception as e:
             raise ValueError(f"Failed to fetch repository: {str(e)}")
 
-    def get_file_content(self, owner: str, repo: str, file_path: str, ref: str = "main") -> str:
+    def iter_owner_repositories(self, owner: str, per_page: int = 100) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every repository of an organization or user, following
+        `Link: rel="next"` pagination lazily
+        """
+        url = f"{self.base_url}/orgs/{owner}/repos?type=all&per_page={per_page}"
+        response = self.session.get(url)
+        if response.status_code == 404:
+            # Not an organization, list the user's own repositories instead
+            url = f"{self.base_url}/users/{owner}/repos?type=owner&per_page={per_page}"
+            response = self.session.get(url)
+
+        while True:
+            response.raise_for_status()
+            for repository in response.json():
+                yield repository
+            url = response.links.get("next", {}).get("url")
+            if not url:
+                return
+            response = self.session.get(url)
+
+    def iter_commits(self, owner: str, repo: str, sha: Optional[str] = None,
+                     per_page: int = 100) -> Iterator[Dict[str, Any]]:
+        """
+        Yield commits newest first, following `Link: rel="next"` pagination lazily.
+
+        Pages are only requested as the caller consumes the iterator, so
+        stopping early (e.g. with itertools.islice) stops the requests too.
+        """
+        url = f"{self.base_url}/repos/{owner}/{repo}/commits?per_page={per_page}"
+        if sha:
+            url += f"&sha={sha}"
+
+        while url:
+            response = self.session.get(url)
+            response.raise_for_status()
+            for commit in response.json():
+                yield commit
+            url = response.links.get("next", {}).get("url")
+
+    def get_commit_count(self, owner: str, repo: str, sha: Optional[str] = None) -> int:
+        """
+        Total number of commits reachable from `sha` (default branch if omitted).
+
+        Requests one commit per page and reads the page number of the
+        `rel="last"` link, which equals the commit count.
+        """
+        url = f"{self.base_url}/repos/{owner}/{repo}/commits?per_page=1"
+        if sha:
+            url += f"&sha={sha}"
+
+        response = self.session.get(url)
+        if response.status_code == 409:
+            return 0  # Empty repository
+        response.raise_for_status()
+
+        last = response.links.get("last", {}).get("url")
+        if last:
+            return int(parse_qs(urlparse(last).query)["page"][0])
+        return len(response.json())
+
+    def get_head_sha(self, repo_url: str) -> str:
+        """Get the SHA of the default-branch HEAD commit with a single lightweight request"""
+        try:
+            parsed = self.parse_github_url(repo_url)
+            response = self.session.get(
+                f"{self.base_url}/repos/{parsed['owner']}/{parsed['repo']}/commits/HEAD",
+                headers={"Accept": "application/vnd.github.sha"}
+            )
+            response.raise_for_status()
+            return response.text.strip()
+
+        except Exception as e:
+            raise ValueError(f"Failed to get HEAD commit: {str(e)}")
+
+    def get_file_content(self, owner: str, repo: str, file_path: str, ref: str = "main",
+                         timeout: Optional[float] = None) -> str:
         """Get content of a specific file"""
         try:
-            response = self.session.get(f"{self.base_url}/repos/{owner}/{repo}/contents/{file_path}?ref={ref}")
+            response = self.session.get(
+                f"{self.base_url}/repos/{owner}/{repo}/contents/{file_path}?ref={ref}",
+                timeout=timeout
+            )
             response.raise_for_status()
             
             data = response.json()
@@ -125,50 +250,336 @@ class GitHubClient:
         except Exception as e:
             raise ValueError(f"Failed to get file content: {str(e)}")
 
-    def get_repository_files_sample(self, repo_url: str, max_files: int = 5) -> Dict[str, str]:
-        """Get sample files from repository for analysis"""
+    def get_repository_files_sample(self, repo_url: str, max_files: int = 5,
+                                    context: Optional["RepositoryFetchContext"] = None,
+                                    concurrency: int = 4,
+                                    deadline: Optional[float] = None,
+                                    mode: str = "contents",
+                                    token_budget: int = 6000,
+                                    max_file_tokens: int = 1500) -> Dict[str, str]:
+        """
+        Get sample files from repository for analysis
+
+        Files are ranked by SampleSelector and the best ones that fit
+        `token_budget` are returned, trimmed to it, most relevant first.
+
+        In "contents" mode each file is one contents API call, run by at most
+        `concurrency` threads. In "tarball" mode the repository archive is
+        downloaded once and the selected files are read from it in a single
+        streaming pass. Either way, if `deadline` seconds pass first, the files
+        read so far are returned.
+        """
         try:
-            parsed = self.parse_github_url(repo_url)
-            owner = parsed["owner"]
-            repo = parsed["repo"]
-            
-            # Get repository data to get default branch
-            repo_response = self.session.get(f"{self.base_url}/repos/{owner}/{repo}")
-            repo_response.raise_for_status()
-            repo_data = repo_response.json()
-            
-            default_branch = repo_data.get("default_branch", "main")
-            
-            # Get file tree
-            tree_response = self.session.get(f"{self.base_url}/repos/{owner}/{repo}/git/trees/{default_branch}?recursive=1")
-            tree_response.raise_for_status()
-            tree_data = tree_response.json()
-            
-            # Filter for code files (common extensions)
-            code_extensions = {'.py', '.js', '.ts', '.java', '.cpp', '.c', '.go', '.rs', '.php', '.rb', '.swift', '.kt', '.scala', '.hs', '.clj'}
-            
-            files = []
-            for item in tree_data.get("tree", []):
-                if item.get("type") == "blob":
-                    path = item.get("path", "")
-                    if any(path.lower().endswith(ext) for ext in code_extensions):
-                        if not path.startswith('.') and len(path) < 100:  # Skip hidden files and very long paths
-                            files.append(path)
-            
-            # Get sample files (first few)
-            sample_files = {}
-            for file_path in files[:max_files]:
-                try:
-                    content = self.get_file_content(owner, repo, file_path, default_branch)
-                    # Truncate very large files
-                    if len(content) > 2000:
-                        content = content[:2000] + "\n\n... (truncated)"
-                    sample_files[file_path] = content
-                except Exception:
-                    # Skip files that can't be read
-                    continue
+            context = context or self.create_fetch_context(repo_url)
+            owner = context.owner
+            repo = context.repo
+            default_branch = context.default_branch
+            
+            selector = SampleSelector(
+                context.languages,
+                token_budget=token_budget,
+                max_files=max_files,
+                max_file_tokens=max_file_tokens
+            )
+            selected = selector.select(context.blobs)
+            if not selected:
+                return {}
+
+            if context.mirror is not None:
+                sample_files = self._read_samples_from_mirror(context.mirror, selected)
+            elif mode == "tarball":
+                sample_files = self._read_samples_from_tarball(owner, repo, default_branch, selected, deadline)
+            elif mode == "contents":
+                sample_files = self._download_samples(owner, repo, default_branch, selected, concurrency, deadline)
+            else:
+                raise ValueError(f"Unknown ingestion mode: {mode}")
             
-            return sample_files
+            # Rank order regardless of completion order
+            return selector.pack(selected, sample_files)
             
         except Exception as e:
-            raise ValueError(f"Failed to get sample files: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Failed to get sample files: {str(e)}")
+
+    def _download_samples(self, owner: str, repo: str, ref: str, paths: List[str],
+                          concurrency: int, deadline: Optional[float]) -> Dict[str, str]:
+        """Fetch files through the contents API on a bounded thread pool"""
+        sample_files = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(paths))))
+        futures = {
+            executor.submit(self._get_sample_file, owner, repo, file_path, ref, deadline): file_path
+            for file_path in paths
+        }
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                content = future.result()
+                if content is not None:
+                    sample_files[futures[future]] = content
+        except FuturesTimeoutError:
+            print(f"Warning: Sample download deadline of {deadline}s reached, "
+                  f"returning {len(sample_files)} of {len(paths)} files")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return sample_files
+
+    def _read_samples_from_tarball(self, owner: str, repo: str, ref: str, paths: List[str],
+                                   deadline: Optional[float]) -> Dict[str, str]:
+        """Read the selected files from a single streamed download of the repository tarball"""
+        sample_files = {}
+        for file_path, content in self.iter_tarball_files(owner, repo, ref, paths, deadline=deadline):
+            sample_files[file_path] = content
+        return sample_files
+
+    def _read_samples_from_mirror(self, mirror: GitMirror, paths: List[str]) -> Dict[str, str]:
+        """Read the selected files from the local bare mirror"""
+        sample_files = {}
+        for file_path, data in mirror.read_files(paths).items():
+            content = decode_sample(data)
+            if content is not None:  # Skip binary or non UTF-8 files
+                sample_files[file_path] = content
+        return sample_files
+
+    def iter_tarball_files(self, owner: str, repo: str, ref: str, paths: List[str],
+                           max_file_bytes: int = 64 * 1024,
+                           deadline: Optional[float] = None) -> Iterator[tuple]:
+        """
+        Yield (path, text) for the wanted files of the repository tarball.
+
+        The archive is read with tarfile in stream mode straight from the
+        HTTP response, so nothing is unpacked to disk and at most
+        `max_file_bytes` of a file are held in memory. The download stops as
+        soon as every wanted file has been seen.
+        """
+        wanted = set(paths)
+        started = time.monotonic()
+        response = self.session.get(
+            f"{self.base_url}/repos/{owner}/{repo}/tarball/{ref}",
+            stream=True,
+            timeout=deadline
+        )
+        try:
+            response.raise_for_status()
+            response.raw.decode_content = True
+
+            with tarfile.open(fileobj=response.raw, mode="r|gz") as archive:
+                for member in archive:
+                    if deadline is not None and time.monotonic() - started > deadline:
+                        print(f"Warning: Tarball deadline of {deadline}s reached, "
+                              f"{len(wanted)} of {len(paths)} files not read")
+                        break
+                    if not member.isfile():
+                        continue
+
+                    # Archive entries are prefixed with "{owner}-{repo}-{sha}/"
+                    file_path = member.name.split("/", 1)[1] if "/" in member.name else member.name
+                    if file_path not in wanted:
+                        continue
+
+                    data = archive.extractfile(member).read(max_file_bytes)
+                    wanted.discard(file_path)
+                    content = decode_sample(data)
+                    if content is not None:  # Skip binary or non UTF-8 files
+                        yield file_path, content
+
+                    if not wanted:
+                        break
+        finally:
+            response.close()
+
+    def _get_sample_file(self, owner: str, repo: str, file_path: str, ref: str,
+                         timeout: Optional[float] = None) -> Optional[str]:
+        """Download one sample file; None if it can't be read"""
+        try:
+            content = self.get_file_content(owner, repo, file_path, ref, timeout=timeout)
+        except Exception:
+            # Skip files that can't be read
+            return None
+        finally:
+            self.session.release_thread()
+        return content
+
+
+class RepositoryFetchContext:
+    """
+    GitHub resources for one analysis, fetched lazily and at most once.
+
+    Passed to every pipeline stage so the repository metadata and the
+    recursive tree (the largest payload) are shared instead of refetched.
+    The tree is reduced to its blob entries as soon as it is parsed.
+
+    When the client has a mirror cache, the tree, file contents and commit
+    history are read from a local bare mirror instead of the REST API.
+    file:// remotes (local repositories, tests) are read from the mirror
+    only: their metadata and languages are derived from it as well.
+    """
+
+    def __init__(self, client: GitHubClient, repo_url: str, commit_history_limit: int = 100):
+        self.client = client
+        self.repo_url = repo_url
+        self.local = repo_url.startswith("file://")
+        if self.local:
+            path = urlparse(repo_url).path.rstrip("/")
+            self.owner = os.path.basename(os.path.dirname(path)) or "local"
+            self.repo = re.sub(r"\.git$", "", os.path.basename(path))
+        else:
+            parsed = client.parse_github_url(repo_url)
+            self.owner = parsed["owner"]
+            self.repo = parsed["repo"]
+        self.commit_history_limit = commit_history_limit
+        self._repository = None
+        self._commit_count = None
+        self._commit_stats = None
+        self._languages = None
+        self._blobs = None
+        self._mirror = None
+        self._mirror_synced = False
+
+    @property
+    def api_path(self) -> str:
+        return f"/repos/{self.owner}/{self.repo}"
+
+    @property
+    def mirror(self) -> Optional[GitMirror]:
+        """Local mirror synced once per analysis; None without a mirror cache or if syncing fails"""
+        if not self._mirror_synced:
+            self._mirror_synced = True
+            if self.client.mirror_cache is not None:
+                try:
+                    self._mirror = self.client.mirror_cache.sync(
+                        self.client.clone_url(self.repo_url), self.client.github_token
+                    )
+                except Exception as e:
+                    if self.local:
+                        raise  # No REST API to fall back to
+                    # Fall back to the REST API
+                    print(f"Warning: Could not sync mirror for {self.repo_url}: {str(e)}")
+            elif self.local:
+                raise ValueError(f"A git mirror cache is required for {self.repo_url}")
+        return self._mirror
+
+    @property
+    def repository(self) -> Dict[str, Any]:
+        if self._repository is None and self.local:
+            languages = self.languages
+            self._repository = {
+                "name": self.repo,
+                "full_name": f"{self.owner}/{self.repo}",
+                "html_url": self.repo_url,
+                "default_branch": self.mirror.default_branch,
+                "language": next(iter(languages), None),
+                "stargazers_count": 0,
+                "forks_count": 0
+            }
+        if self._repository is None:
+            self._repository = self.client.get_json(self.api_path)
+        return self._repository
+
+    @property
+    def default_branch(self) -> str:
+        return self.repository.get("default_branch", "main")
+
+    @property
+    def commit_stats(self) -> "CommitStats":
+        """Aggregates over the latest `commit_history_limit` commits, streamed page by page"""
+        if self._commit_stats is None:
+            stats = CommitStats()
+            if self.mirror is not None:
+                commits = self.mirror.iter_commits(self.commit_history_limit)
+            else:
+                commits = self.client.iter_commits(self.owner, self.repo, per_page=min(self.commit_history_limit, 100))
+            for commit in islice(commits, self.commit_history_limit):
+                stats.add(commit)
+            self._commit_stats = stats
+        return self._commit_stats
+
+    @property
+    def commits(self) -> List[Dict[str, Any]]:
+        """Most recent commits (newest first)"""
+        return self.commit_stats.recent
+
+    @property
+    def commit_count(self) -> int:
+        if self._commit_count is None:
+            if self.mirror is not None:
+                self._commit_count = self.mirror.commit_count()
+            else:
+                self._commit_count = self.client.get_commit_count(self.owner, self.repo)
+        return self._commit_count
+
+    @property
+    def languages(self) -> Dict[str, int]:
+        if self._languages is None:
+            if self.local:
+                self._languages = languages_from_blobs(self.blobs)
+            else:
+                self._languages = self.client.get_json(f"{self.api_path}/languages")
+        return self._languages
+
+    @property
+    def blobs(self) -> List[Dict[str, Any]]:
+        """Files of the default-branch tree as {"path", "size", "sha"}"""
+        if self._blobs is None and self.mirror is not None:
+            self._blobs = self.mirror.list_blobs()
+        if self._blobs is None:
+            tree_data = self.client.get_json(f"{self.api_path}/git/trees/{self.default_branch}?recursive=1")
+            self._blobs = [
+                {"path": item.get("path", ""), "size": item.get("size", 0), "sha": item.get("sha")}
+                for item in tree_data.get("tree", [])
+                if item.get("type") == "blob"
+            ]
+        return self._blobs
+
+
+class CommitStats:
+    """
+    Incremental aggregates over a stream of commits (newest first).
+
+    Only counters and a handful of recent commits are kept, so memory does
+    not grow with the length of the history.
+    """
+
+    RECENT_LIMIT = 10
+
+    def __init__(self):
+        self.count = 0
+        self.authors = Counter()
+        self.merge_count = 0
+        self.weekday_counts = [0] * 7
+        self.newest = None
+        self.oldest = None
+        self.recent = []
+
+    def add(self, commit: Dict[str, Any]):
+        self.count += 1
+        if len(self.recent) < self.RECENT_LIMIT:
+            self.recent.append(commit)
+
+        details = commit.get("commit", {})
+        author = (commit.get("author") or {}).get("login") or (details.get("author") or {}).get("email")
+        if author:
+            self.authors[author] += 1
+        if len(commit.get("parents", [])) > 1:
+            self.merge_count += 1
+
+        date = (details.get("author") or {}).get("date")
+        if date:
+            moment = datetime.fromisoformat(date.replace("Z", "+00:00"))
+            self.weekday_counts[moment.weekday()] += 1
+            if self.newest is None or moment > self.newest:
+                self.newest = moment
+            if self.oldest is None or moment < self.oldest:
+                self.oldest = moment
+
+    def as_dict(self) -> Dict[str, Any]:
+        span_days = (self.newest - self.oldest).total_seconds() / 86400 if self.newest and self.oldest else 0
+        return {
+            "sampled_commits": self.count,
+            "unique_authors": len(self.authors),
+            "top_authors": dict(self.authors.most_common(5)),
+            "merge_commits": self.merge_count,
+            "weekday_counts": self.weekday_counts,
+            "span_days": round(span_days, 2),
+            "commits_per_week": round(self.count / max(span_days / 7, 1 / 7), 2) if self.count else 0.0,
+            "mean_hours_between_commits": round(span_days * 24 / (self.count - 1), 2) if self.count > 1 else None,
+            "newest_commit_at": self.newest.isoformat() if self.newest else None,
+            "oldest_commit_at": self.oldest.isoformat() if self.oldest else None
+        }
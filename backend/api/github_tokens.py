@@ -0,0 +1,188 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import List, Optional
+import requests
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+from .github_cache import CachedSession, ConditionalRequestCache
+from .models import GitHubTokenBudget
+
+
+class RateLimitExhausted(ValueError):
+    """Every token is out of budget and waiting longer is not allowed"""
+
+
+def token_fingerprint(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenPool:
+    """
+    Routes GitHub requests to the token with the most remaining budget.
+
+    Rate-limit state (X-RateLimit-Remaining / X-RateLimit-Reset) lives in the
+    database, so all worker nodes see the same budget. A token is debited
+    optimistically when handed out and corrected from the response headers,
+    but only when the headers disagree with it in a way that affects routing.
+    When every token is exhausted, callers wait for the earliest reset
+    instead of failing, up to `max_wait` seconds.
+    """
+
+    # Header corrections smaller than this are not written back, unless the
+    # budget is this close to running out or its reset window changed
+    RECORD_DRIFT = 50
+
+    def __init__(self, tokens: List[str], max_wait: float = 900):
+        if not tokens:
+            raise ValueError("TokenPool needs at least one token")
+        self.tokens = {token_fingerprint(token): token for token in tokens}
+        self.max_wait = max_wait
+        self.known = {}  # fingerprint -> (remaining, rate_limit, reset_at) as stored after the last debit
+
+    def acquire(self) -> str:
+        """Return the token with the most remaining budget, waiting for a reset if necessary"""
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            now = timezone.now()
+            budgets = {
+                budget.fingerprint: budget
+                for budget in GitHubTokenBudget.objects.filter(fingerprint__in=self.tokens.keys())
+            }
+
+            best_fingerprint, best_remaining, next_reset = None, 0, None
+            for fingerprint in self.tokens:
+                budget = budgets.get(fingerprint)
+                if budget is None or (budget.reset_at and budget.reset_at <= now):
+                    remaining = budget.rate_limit if budget else GitHubTokenBudget._meta.get_field("remaining").default
+                else:
+                    remaining = budget.remaining
+                    if remaining <= 0 and budget.reset_at and (next_reset is None or budget.reset_at < next_reset):
+                        next_reset = budget.reset_at
+                if remaining > best_remaining:
+                    best_fingerprint, best_remaining = fingerprint, remaining
+
+            if best_fingerprint is not None:
+                budget = budgets.get(best_fingerprint)
+                if budget is not None:
+                    GitHubTokenBudget.objects.filter(fingerprint=best_fingerprint).update(remaining=F("remaining") - 1)
+                    self.known[best_fingerprint] = (budget.remaining - 1, budget.rate_limit, budget.reset_at)
+                else:
+                    self.known.pop(best_fingerprint, None)
+                return self.tokens[best_fingerprint]
+
+            wait = (next_reset - now).total_seconds() + 1 if next_reset else 60
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExhausted(
+                    f"GitHub rate limit exhausted for all {len(self.tokens)} tokens; "
+                    f"next reset in {int(wait)}s"
+                )
+            print(f"All GitHub tokens exhausted, waiting {int(wait)}s for rate limit reset")
+            time.sleep(wait)
+
+    def record(self, token: str, response: requests.Response):
+        """Store the rate-limit state GitHub reported for a token"""
+        headers = response.headers
+        if "X-RateLimit-Remaining" not in headers:
+            return
+
+        defaults = {"remaining": int(headers["X-RateLimit-Remaining"])}
+        if "X-RateLimit-Limit" in headers:
+            defaults["rate_limit"] = int(headers["X-RateLimit-Limit"])
+        if "X-RateLimit-Reset" in headers:
+            defaults["reset_at"] = datetime.fromtimestamp(int(headers["X-RateLimit-Reset"]), tz=dt_timezone.utc)
+
+        fingerprint = token_fingerprint(token)
+        known = self.known.get(fingerprint)
+        if known is not None:
+            remaining, rate_limit, reset_at = known
+            if defaults["remaining"] > self.RECORD_DRIFT \
+                    and abs(defaults["remaining"] - remaining) < self.RECORD_DRIFT \
+                    and defaults.get("rate_limit", rate_limit) == rate_limit \
+                    and defaults.get("reset_at", reset_at) == reset_at:
+                return  # The optimistic debit is close enough
+
+        self._store(fingerprint, defaults)
+
+    def mark_exhausted(self, token: str, retry_after: Optional[float] = None):
+        """Take a token out of rotation until its reset (or for retry_after seconds)"""
+        defaults = {"remaining": 0}
+        if retry_after is not None:
+            defaults["reset_at"] = timezone.now() + timedelta(seconds=retry_after)
+        self._store(token_fingerprint(token), defaults)
+
+    def _store(self, fingerprint: str, defaults: dict):
+        # One UPDATE in the common case; the row only has to be created once per token
+        updated = GitHubTokenBudget.objects.filter(fingerprint=fingerprint).update(
+            updated_at=timezone.now(), **defaults
+        )
+        if not updated:
+            GitHubTokenBudget.objects.update_or_create(fingerprint=fingerprint, defaults=defaults)
+        self.known.pop(fingerprint, None)
+
+    def release_thread(self):
+        """Close this thread's database connection (for short-lived helper threads)"""
+        connection.close()
+
+
+def is_rate_limited(response: requests.Response) -> bool:
+    if response.status_code == 429:
+        return True
+    if response.status_code != 403:
+        return False
+    return response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers
+
+
+class TokenPoolSession(CachedSession):
+    """
+    CachedSession that picks a token from a TokenPool for every request and
+    retries on rate-limit responses with another token instead of failing.
+    """
+
+    def __init__(self, token_pool: TokenPool, cache: Optional[ConditionalRequestCache] = None):
+        super().__init__(cache)
+        self.token_pool = token_pool
+
+    def request(self, method, url, headers=None, **kwargs):
+        # Bounded so a misbehaving endpoint can't keep us retrying forever
+        for attempt in range(3 * len(self.token_pool.tokens)):
+            token = self.token_pool.acquire()
+            request_headers = dict(headers or {})
+            request_headers["Authorization"] = f"token {token}"
+
+            response = super().request(method, url, headers=request_headers, **kwargs)
+            self.token_pool.record(token, response)
+
+            if not is_rate_limited(response):
+                return response
+
+            retry_after = response.headers.get("Retry-After")
+            self.token_pool.mark_exhausted(token, float(retry_after) if retry_after else None)
+        return response
+
+    def release_thread(self):
+        self.token_pool.release_thread()
+
+
+_default_pools = {}
+_default_pool_lock = threading.Lock()
+
+
+def get_default_token_pool(interactive: bool = False) -> Optional[TokenPool]:
+    """
+    Process-wide pool over GITHUB_TOKENS (None when no token is configured).
+    The interactive pool, for calls made inside an HTTP request, never waits
+    for a reset: it raises RateLimitExhausted so the caller falls back.
+    """
+    from django.conf import settings
+
+    if not settings.GITHUB_TOKENS:
+        return None
+
+    with _default_pool_lock:
+        if interactive not in _default_pools:
+            max_wait = 0 if interactive else settings.GITHUB_RATE_LIMIT_MAX_WAIT_SECONDS
+            _default_pools[interactive] = TokenPool(settings.GITHUB_TOKENS, max_wait)
+        return _default_pools[interactive]
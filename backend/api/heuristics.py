@@ -0,0 +1,171 @@
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+
+TRAITS = ["complexity", "creativity", "maintainability", "innovation", "organization", "performance"]
+
+# Languages that pull innovation / performance up, by share of the code base
+MODERN_LANGUAGES = {"Rust", "Go", "TypeScript", "Kotlin", "Swift", "Scala", "Haskell", "Clojure", "Elixir", "Zig"}
+SYSTEMS_LANGUAGES = {"C", "C++", "Rust", "Go", "Zig", "Assembly"}
+
+# Base hue (degrees) of the primary color, close to the usual language colors
+LANGUAGE_HUES = {
+    "Python": 210, "JavaScript": 50, "TypeScript": 205, "Java": 25, "C++": 330, "C": 0,
+    "Go": 190, "Rust": 20, "PHP": 240, "Ruby": 355, "Swift": 15, "Kotlin": 270,
+    "Scala": 350, "Haskell": 260, "Clojure": 130,
+}
+
+TRAIT_TAGS = {
+    "complexity": "intricate",
+    "creativity": "creative",
+    "maintainability": "maintainable",
+    "innovation": "modern",
+    "organization": "structured",
+    "performance": "performant",
+}
+
+TEST_DIRECTORIES = {"test", "tests", "spec", "specs", "__tests__"}
+
+
+def repository_metrics(blobs: List[Dict[str, Any]], languages: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    Metrics the heuristic scorer works from, computed from the tree listing
+    ({"path", "size"} blobs) and the language breakdown (bytes or percentages)
+    """
+    paths = [blob["path"] for blob in blobs]
+    sizes = np.array([blob.get("size") or 0 for blob in blobs], dtype=float)
+    depths = np.array([path.count("/") for path in paths], dtype=float)
+    log_sizes = np.log1p(sizes)
+
+    return {
+        "file_count": len(paths),
+        "languages": dict(languages or {}),
+        "mean_depth": float(depths.mean()) if len(paths) else 0.0,
+        "max_depth": float(depths.max()) if len(paths) else 0.0,
+        "median_log_size": float(np.median(log_sizes)) if len(paths) else 0.0,
+        "p90_log_size": float(np.percentile(log_sizes, 90)) if len(paths) else 0.0,
+        "log_size_spread": float(log_sizes.std()) if len(paths) else 0.0,
+        "test_ratio": sum(
+            1 for path in paths
+            if TEST_DIRECTORIES.intersection(path.lower().split("/")[:-1]) or "test_" in path.lower()
+        ) / len(paths) if paths else 0.0,
+        "has_readme": any(path.lower().startswith("readme") for path in paths),
+    }
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _hsv_to_hex(hue: np.ndarray, saturation: np.ndarray, value: np.ndarray) -> List[str]:
+    """Vectorized HSV (hue in degrees, s / v in 0-1) to '#rrggbb'"""
+    hue = np.mod(hue, 360) / 60.0
+    chroma = value * saturation
+    x = chroma * (1 - np.abs(np.mod(hue, 2) - 1))
+    zero = np.zeros_like(hue)
+    sector = np.floor(hue).astype(int) % 6
+    r = np.choose(sector, [chroma, x, zero, zero, x, chroma])
+    g = np.choose(sector, [x, chroma, chroma, x, zero, zero])
+    b = np.choose(sector, [zero, zero, x, chroma, chroma, x])
+    rgb = np.clip(np.rint((np.stack([r, g, b], axis=1) + (value - chroma)[:, None]) * 255), 0, 255).astype(int)
+    return [f"#{red:02x}{green:02x}{blue:02x}" for red, green, blue in rgb]
+
+
+def score_repositories(metrics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Deterministic personality for many repositories at once.
+
+    Every trait is a logistic function of a few repository metrics, computed
+    column-wise over all repositories. Results have the same shape as a Z AI
+    analysis ("traits", "visualization", "description", "tags", "insights"),
+    so they can be stored the same way.
+    """
+    if not metrics:
+        return []
+
+    # Language mix as normalized shares
+    shares = []
+    for item in metrics:
+        total = sum(item["languages"].values())
+        shares.append({name: value / total for name, value in item["languages"].items()} if total else {})
+
+    log_files = np.log1p(np.array([item["file_count"] for item in metrics], dtype=float))
+    mean_depth = np.array([item["mean_depth"] for item in metrics], dtype=float)
+    # Empty trees get neutral size features rather than "tiny files"
+    p90_size = np.where(log_files > 0, [item["p90_log_size"] for item in metrics], 9.0)
+    spread = np.where(log_files > 0, [item["log_size_spread"] for item in metrics], 1.5)
+    test_ratio = np.array([item["test_ratio"] for item in metrics], dtype=float)
+    has_readme = np.array([item["has_readme"] for item in metrics], dtype=float)
+    language_count = np.array([sum(1 for share in mix.values() if share >= 0.05) for mix in shares], dtype=float)
+    entropy = np.array([
+        -sum(share * np.log(share) for share in mix.values() if share > 0) / np.log(max(len(mix), 2))
+        for mix in shares
+    ], dtype=float)
+    modern_share = np.array([sum(mix.get(name, 0) for name in MODERN_LANGUAGES) for mix in shares], dtype=float)
+    systems_share = np.array([sum(mix.get(name, 0) for name in SYSTEMS_LANGUAGES) for mix in shares], dtype=float)
+
+    traits = np.stack([
+        # complexity: big, deep trees with large files and many languages
+        _sigmoid(0.8 * (log_files - 4.5) + 0.6 * (mean_depth - 2.5) + 0.5 * (p90_size - 9) + 0.8 * entropy - 0.4),
+        # creativity: an unusual mix of languages
+        _sigmoid(1.5 * entropy + 0.4 * (language_count - 2) - 0.5),
+        # maintainability: tests, a README, files of moderate and even size
+        _sigmoid(6.0 * np.minimum(test_ratio, 0.3) + 1.0 * has_readme - 0.6 * (p90_size - 9) - 0.5 * (spread - 1.5) - 0.8),
+        # innovation: share of recent languages
+        _sigmoid(3.0 * (modern_share - 0.3) + 0.5 * entropy),
+        # organization: moderate nesting, tests and a README
+        _sigmoid(0.6 * np.minimum(mean_depth, 4) - 0.8 * np.maximum(mean_depth - 4, 0)
+                 + 3.0 * np.minimum(test_ratio, 0.3) + 0.8 * has_readme - 1.5),
+        # performance: share of systems languages
+        _sigmoid(3.0 * (systems_share - 0.3) - 0.3 * (p90_size - 9)),
+    ], axis=1)
+    traits = np.round(np.clip(traits, 0.0, 1.0), 2)
+    complexity, creativity, maintainability, innovation, organization = (traits[:, i] for i in range(5))
+
+    complexity_level = np.clip(np.rint(1 + 9 * complexity), 1, 10).astype(int)
+    particle_count = np.clip(np.rint(10 + 190 * log_files / np.log(10000)), 10, 200).astype(int)
+    rotation_speed = np.round(0.2 + 1.8 * creativity, 2)
+    shape_type = np.select(
+        [complexity >= 0.66, organization >= 0.6],
+        ["complex", "cube"],
+        default="sphere"
+    )
+
+    base_hue = np.array([
+        LANGUAGE_HUES.get(max(mix, key=mix.get), 280) if mix else 280 for mix in shares
+    ], dtype=float)
+    saturation = 0.45 + 0.45 * creativity
+    value = 0.55 + 0.4 * maintainability
+    primary = _hsv_to_hex(base_hue, saturation, value)
+    secondary = _hsv_to_hex(base_hue + 40 + 120 * innovation, saturation * 0.8, value)
+    accent = _hsv_to_hex(base_hue + 180, np.full_like(value, 0.85), np.full_like(value, 0.95))
+
+    results = []
+    for index, item in enumerate(metrics):
+        scores = {name: float(traits[index, column]) for column, name in enumerate(TRAITS)}
+        tags = [TRAIT_TAGS[name] for name, score in sorted(scores.items(), key=lambda x: -x[1]) if score >= 0.6][:3]
+        dominant = max(shares[index], key=shares[index].get) if shares[index] else "multi-language"
+        results.append({
+            "traits": scores,
+            "visualization": {
+                "colors": {"primary": primary[index], "secondary": secondary[index], "accent": accent[index]},
+                "shape": {
+                    "type": str(shape_type[index]),
+                    "complexity": int(complexity_level[index]),
+                    "rotation_speed": float(rotation_speed[index]),
+                    "particle_count": int(particle_count[index]),
+                },
+            },
+            "description": (
+                f"Estimated from repository structure: a {dominant} codebase of {item['file_count']} files"
+                + (f" that reads as {', '.join(tags)}." if tags else ".")
+            ),
+            "tags": tags,
+            "insights": [],
+        })
+    return results
+
+
+def score_repository(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """Heuristic personality of a single repository"""
+    return score_repositories([metrics])[0]
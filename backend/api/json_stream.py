@@ -0,0 +1,62 @@
+import json
+from typing import Any, List, Tuple
+
+
+class IncrementalObjectParser:
+    """
+    Parses a JSON object that arrives in chunks and emits each top-level
+    member as soon as its value is complete.
+
+    Only the boundaries of top-level members are tracked (string / escape
+    state and nesting depth); each completed member is then decoded with
+    json.loads, so values are exactly what a full parse would produce.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0       # Next character to scan
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.member_start = None
+        self.finished = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Add text and return the (key, value) members completed by it"""
+        self.buffer += chunk
+        members = []
+
+        while self.position < len(self.buffer) and not self.finished:
+            char = self.buffer[self.position]
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+                if self.depth == 1:
+                    self.member_start = self.position + 1
+            elif char in "}]":
+                if self.depth == 1:
+                    members.extend(self._complete_member())
+                    self.finished = True
+                self.depth -= 1
+            elif char == "," and self.depth == 1:
+                members.extend(self._complete_member())
+                self.member_start = self.position + 1
+
+            self.position += 1
+
+        return members
+
+    def _complete_member(self) -> List[Tuple[str, Any]]:
+        text = self.buffer[self.member_start:self.position].strip()
+        if not text:
+            return []
+        return list(json.loads("{" + text + "}").items())
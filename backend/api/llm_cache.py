@@ -0,0 +1,86 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+from .disk_cache import DiskLRUCache
+
+
+class LLMResponseCache:
+    """
+    Content-addressed cache of LLM completions.
+
+    The key is a hash of the whole request payload (model, system and user
+    prompts, sampling parameters), so any change to the prompt is a miss.
+    Entries expire after `ttl_seconds`; total size is bounded with LRU
+    eviction by the underlying DiskLRUCache.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, ttl_seconds: float):
+        self.store = DiskLRUCache(directory, max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, payload: Dict[str, Any]) -> str:
+        canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return "llm:" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, payload: Dict[str, Any]) -> Optional[str]:
+        """Cached completion content for a request payload, if present and fresh"""
+        key = self.key_for(payload)
+        entry = self.store.get(key)
+        if entry is not None:
+            metadata, body = entry
+            if time.time() - metadata.get("stored_at", 0) <= self.ttl_seconds:
+                self._record(hit=True)
+                return body.decode("utf-8")
+            self.store.delete(key)
+
+        self._record(hit=False)
+        return None
+
+    def set(self, payload: Dict[str, Any], content: str):
+        try:
+            self.store.set(self.key_for(payload), {"model": payload.get("model")}, content.encode("utf-8"))
+        except OSError as e:
+            print(f"Warning: Could not write LLM cache entry: {str(e)}")
+
+    def _record(self, hit: bool):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_llm_cache() -> Optional[LLMResponseCache]:
+    """Process-wide LLM cache configured from Django settings (None when disabled)"""
+    global _default_cache
+    from django.conf import settings
+
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMResponseCache(
+                settings.LLM_CACHE_DIR,
+                settings.LLM_CACHE_MAX_BYTES,
+                settings.LLM_CACHE_TTL_SECONDS
+            )
+        return _default_cache
@@ -0,0 +1,280 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Dict, Iterator, Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class LLMGateway:
+    """
+    Shared entry point for LLM provider calls within a process.
+
+    - One requests.Session with a keep-alive connection pool, so calls reuse
+      TLS connections instead of handshaking per analysis.
+    - A cap on concurrent in-flight calls of this process.
+    - A tokens-per-minute budget of this process over a sliding 60 s window:
+      callers whose estimated tokens don't fit wait in line instead of
+      triggering 429s.
+
+    SharedLLMGateway enforces the same limits across processes.
+    """
+
+    WINDOW_SECONDS = 60
+
+    def __init__(self, max_concurrency: int = 4, tokens_per_minute: int = 0):
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute  # 0 disables the budget
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.condition = threading.Condition()
+        self.window = deque()  # [timestamp, tokens] reservations in the last minute
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_seconds = 0.0
+
+    def post(self, url: str, estimated_tokens: int, **kwargs) -> requests.Response:
+        """POST through the pool once a concurrency slot and token budget are available"""
+        reservation = self._acquire(estimated_tokens)
+        try:
+            response = self.session.post(url, **kwargs)
+        except Exception:
+            self._release(succeeded=False)
+            raise
+        self._release(succeeded=True)
+        try:
+            actual = response.json().get("usage", {}).get("total_tokens")
+        except ValueError:
+            actual = None
+        self._settle(reservation, actual)
+        return response
+
+    @contextmanager
+    def stream(self, url: str, estimated_tokens: int, **kwargs) -> Iterator[requests.Response]:
+        """
+        Streaming POST. The concurrency slot is held until the caller has
+        finished reading the body, since the call is in flight until then.
+        Callers that read the provider's usage from the stream set
+        `response.total_tokens`, which replaces the estimate.
+        """
+        reservation = self._acquire(estimated_tokens)
+        succeeded = False
+        response = None
+        try:
+            response = self.session.post(url, stream=True, **kwargs)
+            response.total_tokens = None
+            yield response
+            succeeded = True
+        finally:
+            if response is not None:
+                response.close()
+            self._release(succeeded)
+        self._settle(reservation, response.total_tokens)
+
+    def _acquire(self, estimated_tokens: int) -> Optional[list]:
+        """Wait for token budget and a concurrency slot"""
+        enqueued_at = time.monotonic()
+        with self.condition:
+            self.queued += 1
+        try:
+            reservation = self._reserve(estimated_tokens)
+            self._take_slot()
+        finally:
+            with self.condition:
+                self.queued -= 1
+
+        with self.condition:
+            self.in_flight += 1
+            self.total_wait_seconds += time.monotonic() - enqueued_at
+        return reservation
+
+    def _release(self, succeeded: bool):
+        self._give_slot()
+        with self.condition:
+            self.in_flight -= 1
+            if succeeded:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def _take_slot(self):
+        self.slots.acquire()
+
+    def _give_slot(self):
+        self.slots.release()
+
+    def _reserve(self, tokens: int) -> Optional[list]:
+        if not self.tokens_per_minute:
+            return None
+
+        with self.condition:
+            while True:
+                self._expire(time.monotonic())
+                used = sum(entry[1] for entry in self.window)
+                # A single oversized request is let through once the window is empty
+                if used + tokens <= self.tokens_per_minute or not self.window:
+                    reservation = [time.monotonic(), tokens]
+                    self.window.append(reservation)
+                    return reservation
+                wait = self.window[0][0] + self.WINDOW_SECONDS - time.monotonic()
+                self.condition.wait(max(wait, 0.05))
+
+    def _settle(self, reservation: Optional[list], actual: Optional[int]):
+        """Replace the estimate with the provider-reported usage when available"""
+        if reservation is None or actual is None:
+            return
+        with self.condition:
+            reservation[1] = actual
+            self.condition.notify_all()
+
+    def _expire(self, now: float):
+        while self.window and self.window[0][0] + self.WINDOW_SECONDS <= now:
+            self.window.popleft()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.condition:
+            self._expire(time.monotonic())
+            handled = self.completed + self.failed
+            return {
+                "queue_depth": self.queued,
+                "in_flight": self.in_flight,
+                "max_concurrency": self.max_concurrency,
+                "tokens_last_minute": sum(entry[1] for entry in self.window),
+                "tokens_per_minute": self.tokens_per_minute,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait_seconds": round(self.total_wait_seconds / handled, 3) if handled else 0.0
+            }
+
+
+class SharedLLMGateway(LLMGateway):
+    """
+    LLMGateway whose limits hold for every process sharing the PostgreSQL
+    database, however many workers are running.
+
+    - Concurrency slots are session advisory locks (one key per slot), so
+      Postgres frees the slot of a process that dies mid-call.
+    - The tokens-per-minute window is a table of reservations, checked and
+      appended under a transaction advisory lock.
+
+    The process-local semaphore still bounds this process's threads and its
+    connection pool.
+    """
+
+    LOCK_NAMESPACE = 7311  # First key of the gateway's advisory locks
+    TOKEN_WINDOW_LOCK = -1  # Second key of the token window lock; slots are 0..n-1
+    POLL_SECONDS = 0.25
+
+    def __init__(self, max_concurrency: int = 4, tokens_per_minute: int = 0):
+        super().__init__(max_concurrency, tokens_per_minute)
+        self.held = threading.local()  # Slot of the call running on this thread
+
+    def _take_slot(self):
+        from django.db import connection
+
+        super()._take_slot()
+        try:
+            while True:
+                with connection.cursor() as cursor:
+                    # Stops at the first slot it can lock
+                    cursor.execute(
+                        "SELECT slot FROM generate_series(0, %s) AS slot "
+                        "WHERE pg_try_advisory_lock(%s, slot) LIMIT 1",
+                        [self.max_concurrency - 1, self.LOCK_NAMESPACE]
+                    )
+                    row = cursor.fetchone()
+                if row is not None:
+                    self.held.slot = row[0]
+                    return
+                time.sleep(self.POLL_SECONDS)
+        except BaseException:
+            super()._give_slot()
+            raise
+
+    def _give_slot(self):
+        from django.db import connection
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s, %s)", [self.LOCK_NAMESPACE, self.held.slot])
+        except Exception as e:
+            # Only if the connection is gone, which released the lock with it
+            print(f"Warning: Could not release LLM gateway slot {self.held.slot}: {str(e)}")
+        finally:
+            super()._give_slot()
+
+    def _reserve(self, tokens: int):
+        if not self.tokens_per_minute:
+            return None
+        from django.db import connection, transaction
+        from django.db.models import Min, Sum
+        from django.utils import timezone
+        from .models import LLMTokenReservation
+
+        while True:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_xact_lock(%s, %s)",
+                                   [self.LOCK_NAMESPACE, self.TOKEN_WINDOW_LOCK])
+                now = timezone.now()
+                since = now - timedelta(seconds=self.WINDOW_SECONDS)
+                LLMTokenReservation.objects.filter(reserved_at__lte=since).delete()
+                window = LLMTokenReservation.objects.aggregate(used=Sum('tokens'), oldest=Min('reserved_at'))
+                # A single oversized request is let through once the window is empty
+                if window['used'] is None or window['used'] + tokens <= self.tokens_per_minute:
+                    return LLMTokenReservation.objects.create(reserved_at=now, tokens=tokens)
+                wait = (window['oldest'] - since).total_seconds()
+            # Settled calls free budget early, so check again at least every second
+            time.sleep(min(max(wait, 0.05), 1))
+
+    def _settle(self, reservation, actual: Optional[int]):
+        if reservation is None or actual is None:
+            return
+        from .models import LLMTokenReservation
+        LLMTokenReservation.objects.filter(id=reservation.id).update(tokens=actual)
+
+    def stats(self) -> Dict[str, Any]:
+        from django.db.models import Sum
+        from django.utils import timezone
+        from .models import LLMTokenReservation
+
+        stats = super().stats()
+        if self.tokens_per_minute:
+            since = timezone.now() - timedelta(seconds=self.WINDOW_SECONDS)
+            stats["tokens_last_minute"] = LLMTokenReservation.objects.filter(
+                reserved_at__gt=since
+            ).aggregate(used=Sum('tokens'))['used'] or 0
+        return stats
+
+
+_default_gateway = None
+_default_gateway_lock = threading.Lock()
+
+
+def get_default_gateway() -> LLMGateway:
+    """
+    Process-wide gateway configured from Django settings. On PostgreSQL the
+    limits are shared by every process; elsewhere (SQLite development) they
+    apply per process.
+    """
+    global _default_gateway
+    from django.conf import settings
+    from django.db import connection
+
+    with _default_gateway_lock:
+        if _default_gateway is None:
+            gateway_class = SharedLLMGateway if connection.vendor == 'postgresql' else LLMGateway
+            _default_gateway = gateway_class(
+                max_concurrency=settings.ZAI_MAX_CONCURRENCY,
+                tokens_per_minute=settings.ZAI_TOKENS_PER_MINUTE
+            )
+        return _default_gateway
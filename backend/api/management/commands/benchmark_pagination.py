@@ -0,0 +1,114 @@
+import time
+import uuid
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.pagination import Cursor, PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from repositories.models import Repository
+from api.pagination import CreatedAtCursorPagination
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Time repository list pages at increasing depth with page-number (COUNT + OFFSET) '
+        'and cursor (keyset) pagination. --seed adds synthetic rows that are rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Synthetic repositories to insert for the run (rolled back at the end)'
+        )
+        parser.add_argument(
+            '--depths', default='1,10,100,1000',
+            help='Comma-separated page numbers to fetch'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Fetches per measurement; the median is reported'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            depths = sorted({int(depth) for depth in options['depths'].split(',')})
+        except ValueError:
+            raise CommandError("--depths must be comma-separated page numbers")
+        if not depths or depths[0] < 1:
+            raise CommandError("--depths must be at least 1")
+
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    self.seed(options['seed'])
+                self.run(depths, max(1, options['repeat']))
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def seed(self, count: int):
+        self.stdout.write(f"Seeding {count} repositories...")
+        batch_size = 5000
+        for start in range(0, count, batch_size):
+            repositories = []
+            for _ in range(start, min(start + batch_size, count)):
+                name = uuid.uuid4().hex[:12]
+                repositories.append(Repository(
+                    repo_url=f"https://github.com/benchmark/{name}",
+                    repo_name=name,
+                    owner='benchmark',
+                    platform='github'
+                ))
+            Repository.objects.bulk_create(repositories)
+
+    def run(self, depths, repeat: int):
+        queryset = Repository.objects.all()
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        total = queryset.count()
+        self.stdout.write(f"{total} repositories, {page_size} per page")
+        self.stdout.write(f"{'page':>8} {'page-number ms':>16} {'cursor ms':>12}")
+
+        factory = APIRequestFactory(SERVER_NAME='localhost')
+        cursor_pagination = CreatedAtCursorPagination()
+        ordered = queryset.order_by(*cursor_pagination.ordering)
+
+        for depth in depths:
+            offset = (depth - 1) * page_size
+            if offset >= total:
+                self.stdout.write(f"{depth:>8} {'(past the end)':>16}")
+                continue
+
+            # The cursor a client holds after paging to `depth`: the position of the
+            # last row of the previous page (looked up here, not timed)
+            position = None
+            if offset:
+                position = str(ordered.values_list('created_at', flat=True)[offset - 1])
+            cursor_pagination.base_url = 'http://localhost/'
+            cursor_url = cursor_pagination.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+            page_number = self.measure(
+                repeat,
+                lambda: PageNumberPagination().paginate_queryset(
+                    queryset, Request(factory.get('/', {'page': depth}))
+                )
+            )
+            cursor = self.measure(
+                repeat,
+                lambda: CreatedAtCursorPagination().paginate_queryset(
+                    queryset, Request(factory.get(cursor_url))
+                )
+            )
+            self.stdout.write(f"{depth:>8} {page_number:>16.2f} {cursor:>12.2f}")
+
+    def measure(self, repeat: int, fetch) -> float:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fetch()
+            timings.append((time.perf_counter() - started) * 1000)
+        return sorted(timings)[len(timings) // 2]
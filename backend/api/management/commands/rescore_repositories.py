@@ -0,0 +1,141 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from analyses.models import Analysis
+from personalities.models import CodeInsight, Personality
+from repositories.models import Repository
+from api.llm_gateway import get_default_gateway
+from api.tasks import build_insights, result_personality_fields
+from api.zai_client import ZAIClient
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-score already analyzed repositories offline, several per LLM request. '
+        'Interrupted runs resume where they stopped when started again with the same --run-id.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.ZAI_BATCH_SIZE,
+            help='Repositories per LLM request'
+        )
+        parser.add_argument(
+            '--run-id', default=None,
+            help='Identifier of this run (default: rescore-YYYY-MM-DD); repositories already '
+                 'scored under it are skipped'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Score at most this many repositories'
+        )
+
+    def handle(self, *args, **options):
+        zai_api_key = os.getenv('Z_AI_API_KEY')
+        if not zai_api_key:
+            raise CommandError("Z_AI_API_KEY not found in environment")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        run_id = options['run_id'] or f"rescore-{timezone.now().date().isoformat()}"
+        zai_client = ZAIClient(zai_api_key, gateway=get_default_gateway())
+
+        # Latest completed analysis per repository supplies the summary;
+        # repositories already scored in this run are skipped (resume)
+        latest = Analysis.objects.filter(
+            repository=OuterRef('pk'), status='completed'
+        ).order_by('-created_at').values('id')[:1]
+        pending = list(
+            Repository.objects
+            .annotate(latest_analysis_id=Subquery(latest))
+            .filter(latest_analysis_id__isnull=False)
+            .exclude(analyses__analysis_metadata__batch_run=run_id)
+            .order_by('id')
+            .values_list('latest_analysis_id', flat=True)
+        )
+        if options['limit'] is not None:
+            pending = pending[:options['limit']]
+
+        self.stdout.write(f"Run {run_id}: {len(pending)} repositories to score")
+
+        scored = 0
+        for start in range(0, len(pending), options['batch_size']):
+            sources = Analysis.objects.select_related('repository').in_bulk(
+                pending[start:start + options['batch_size']]
+            )
+            batch = {str(index): analysis for index, analysis in enumerate(sources.values(), 1)}
+
+            try:
+                results = zai_client.analyze_repositories_batch(
+                    {key: self.summarize(analysis) for key, analysis in batch.items()}
+                )
+            except ValueError as e:
+                self.stdout.write(self.style.WARNING(f"Batch starting at {start} failed: {str(e)}"))
+                continue
+
+            self.persist(run_id, batch, results)
+            scored += len(results)
+            if len(results) < len(batch):
+                self.stdout.write(self.style.WARNING(
+                    f"{len(batch) - len(results)} repositories in batch starting at {start} "
+                    f"got no valid result; rerun with --run-id {run_id} to retry them"
+                ))
+
+        self.stdout.write(self.style.SUCCESS(f"Run {run_id}: scored {scored} of {len(pending)} repositories"))
+
+    def summarize(self, analysis: Analysis) -> dict:
+        """Repository data for the prompt, rebuilt from what the last analysis stored"""
+        repository = analysis.repository
+        github = analysis.analysis_metadata.get("github_api_response", {})
+        return {
+            "repository": {
+                "full_name": github.get("full_name") or f"{repository.owner}/{repository.repo_name}",
+                "description": repository.description,
+                "language": repository.language,
+                "stargazers_count": repository.stars_count,
+                "forks_count": repository.forks_count,
+            },
+            "file_count": analysis.file_count,
+            "commit_count": analysis.commit_count,
+            "commit_stats": analysis.analysis_metadata.get("commit_stats", {}),
+            "top_languages": analysis.top_languages,
+        }
+
+    def persist(self, run_id: str, batch: dict, results: dict):
+        """Store one batch of results with a handful of bulk inserts"""
+        now = timezone.now()
+        analyses, personalities, insights = [], [], []
+
+        for key, result in results.items():
+            source = batch[key]
+            analysis = Analysis(
+                repository=source.repository,
+                status='completed',
+                stage='completed',
+                file_count=source.file_count,
+                commit_count=source.commit_count,
+                head_sha=source.head_sha,
+                top_languages=source.top_languages,
+                analysis_metadata={
+                    "batch_run": run_id,
+                    "rescored_from": str(source.id),
+                    "github_api_response": source.analysis_metadata.get("github_api_response", {}),
+                    "commit_stats": source.analysis_metadata.get("commit_stats", {}),
+                },
+                completed_at=now  # bulk_create skips Analysis.save()
+            )
+            personality = Personality(analysis=analysis, **result_personality_fields(result))
+            analyses.append(analysis)
+            personalities.append(personality)
+            insights.extend(build_insights(personality, result.get("insights", [])))
+
+        with transaction.atomic():
+            Analysis.objects.bulk_create(analyses)
+            Personality.objects.bulk_create(personalities)
+            CodeInsight.objects.bulk_create(insights)
+            Repository.objects.filter(
+                id__in=[analysis.repository_id for analysis in analyses]
+            ).update(last_analyzed_at=now)
@@ -0,0 +1,73 @@
+import signal
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.llm_gateway import get_default_gateway
+from api.resilience import get_circuit_breaker
+from api.workers import AnalysisWorkerPool
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of workers that process queued repository analyses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.ANALYSIS_WORKER_COUNT,
+            help='Number of concurrent analyses on this node'
+        )
+        parser.add_argument(
+            '--lease-seconds', type=int, default=settings.ANALYSIS_JOB_LEASE_SECONDS,
+            help='How long a job stays leased without a heartbeat before another worker may take it'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.ANALYSIS_WORKER_POLL_INTERVAL,
+            help='Seconds to wait between polls when the queue is empty'
+        )
+        parser.add_argument(
+            '--drain-timeout', type=float, default=settings.ANALYSIS_WORKER_DRAIN_TIMEOUT,
+            help='Seconds to wait for in-flight analyses on shutdown'
+        )
+        parser.add_argument(
+            '--stats-interval', type=float, default=60.0,
+            help='Seconds between worker / LLM gateway stats log lines (0 disables)'
+        )
+
+    def handle(self, *args, **options):
+        pool = AnalysisWorkerPool(
+            worker_count=options['workers'],
+            lease_seconds=options['lease_seconds'],
+            poll_interval=options['poll_interval']
+        )
+
+        def request_shutdown(signum, frame):
+            self.stdout.write(f"Received signal {signum}, draining {pool.in_flight()} in-flight analyses...")
+            pool.stop_event.set()
+
+        signal.signal(signal.SIGTERM, request_shutdown)
+        signal.signal(signal.SIGINT, request_shutdown)
+
+        pool.start()
+        self.stdout.write(self.style.SUCCESS(
+            f"Started {options['workers']} analysis workers on {pool.node_id}"
+        ))
+
+        # Keep the main thread responsive to signals until shutdown is requested
+        last_stats = time.monotonic()
+        while not pool.stop_event.wait(1):
+            if options['stats_interval'] and time.monotonic() - last_stats >= options['stats_interval']:
+                last_stats = time.monotonic()
+                gateway = get_default_gateway().stats()
+                self.stdout.write(
+                    f"analyses in flight: {pool.in_flight()}/{options['workers']} | "
+                    f"LLM queue: {gateway['queue_depth']} "
+                    f"in flight: {gateway['in_flight']}/{gateway['max_concurrency']} "
+                    f"tokens/min: {gateway['tokens_last_minute']}/{gateway['tokens_per_minute'] or '-'} avg wait: {gateway['avg_wait_seconds']}s | "
+                    f"circuits: github={get_circuit_breaker('github').state} zai={get_circuit_breaker('zai').state}"
+                )
+
+        if pool.drain(options['drain_timeout']):
+            self.stdout.write(self.style.SUCCESS('All workers drained'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                'Drain timed out; exiting, unfinished jobs will be re-leased once their lease expires'
+            ))
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.11 on 2026-10-17 23:08
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GitHubTokenBudget',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('fingerprint', models.CharField(max_length=64, unique=True)),
+                ('rate_limit', models.IntegerField(default=5000)),
+                ('remaining', models.IntegerField(default=5000)),
+                ('reset_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'github_token_budgets',
+            },
+        ),
+    ]
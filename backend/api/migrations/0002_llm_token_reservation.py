@@ -0,0 +1,25 @@
+# Generated by Django 4.2.11 on 2026-10-17 23:50
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMTokenReservation',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('reserved_at', models.DateTimeField(db_index=True)),
+                ('tokens', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'llm_token_reservations',
+            },
+        ),
+    ]
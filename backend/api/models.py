@@ -0,0 +1,38 @@
+import uuid
+from django.db import models
+
+
+class GitHubTokenBudget(models.Model):
+    """
+    Last known GitHub rate-limit state of one API token, shared by every
+    worker node. Tokens themselves are never stored, only a fingerprint.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    fingerprint = models.CharField(max_length=64, unique=True)
+    rate_limit = models.IntegerField(default=5000)
+    remaining = models.IntegerField(default=5000)
+    reset_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'github_token_budgets'
+
+    def __str__(self):
+        return f"Token {self.fingerprint[:8]}: {self.remaining}/{self.rate_limit}"
+
+
+class LLMTokenReservation(models.Model):
+    """
+    Tokens an LLM call reserved (settled to the provider-reported usage),
+    making up the deployment-wide tokens-per-minute window of SharedLLMGateway.
+    Rows older than the window are deleted as new calls reserve.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    reserved_at = models.DateTimeField(db_index=True)
+    tokens = models.IntegerField()
+
+    class Meta:
+        db_table = 'llm_token_reservations'
+
+    def __str__(self):
+        return f"{self.tokens} tokens at {self.reserved_at}"
@@ -0,0 +1,18 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination on created_at, newest first.
+
+    The cursor holds the last created_at seen, so each page is one
+    `WHERE created_at < <cursor> ORDER BY created_at DESC, id DESC LIMIT n`
+    range scan on the (created_at, id) index: no COUNT(*) and no deep
+    OFFSET, so fetching page 10 000 costs the same as page 1, and rows
+    inserted while a client pages through never shift or repeat entries.
+    DRF filters on the first ordering field only: rows sharing the cursor's
+    created_at are skipped with a small offset stored in the cursor, and
+    `id` just keeps their order stable.
+    """
+
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,16 @@
+import json
+from rest_framework.renderers import BaseRenderer
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets content negotiation accept `Accept: text/event-stream`; the views
+    using it return a StreamingHttpResponse, so nothing is rendered here.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only reached for errors raised before streaming starts (e.g. 404)
+        return f"event: error\ndata: {json.dumps(data, default=str)}\n\n".encode(self.charset)
@@ -0,0 +1,247 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+import requests
+
+
+class CircuitOpenError(ValueError):
+    """A provider's circuit is open, so the call was not attempted"""
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Whether a failure is worth retrying: timeouts, connection errors and
+    5xx / 429 responses. Our clients wrap requests exceptions in ValueError,
+    so the whole cause / context chain is inspected.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, CircuitOpenError):
+            return False
+        if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+            return True
+        response = getattr(error, "response", None)
+        if isinstance(error, requests.exceptions.RequestException) and response is not None:
+            return response.status_code == 429 or response.status_code >= 500
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for transient failures"""
+
+    def __init__(self, attempts: int = 3, base_delay: float = 1.0, max_delay: float = 20.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, retry: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+    def call(self, func: Callable[..., Any], *args,
+             retryable: Callable[[BaseException], bool] = is_transient, **kwargs) -> Any:
+        for attempt in range(self.attempts):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt + 1 >= self.attempts or not retryable(e):
+                    raise
+                delay = self.delay(attempt)
+                print(f"Warning: Transient failure ({str(e)}), retrying in {delay:.1f}s "
+                      f"({attempt + 2}/{self.attempts})")
+                time.sleep(delay)
+
+
+class CircuitBreaker:
+    """
+    Stops calling a provider after `failure_threshold` consecutive transient
+    failures. While open, calls fail immediately with CircuitOpenError; after
+    `reset_timeout` seconds one trial call is let through (half-open) and
+    its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self.lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        with self.lock:
+            state = self._state()
+            if state == "open" or (state == "half_open" and self.trial_in_flight):
+                raise CircuitOpenError(f"{self.name} circuit is open after {self.failures} consecutive failures")
+            trial = state == "half_open"
+            if trial:
+                self.trial_in_flight = True
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._record_failure(transient=is_transient(e), trial=trial)
+            raise
+        self._record_success()
+        return result
+
+    def _record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def _record_failure(self, transient: bool, trial: bool):
+        with self.lock:
+            if trial:
+                self.trial_in_flight = False
+            if not transient:
+                # The provider answered, just not usefully: it is reachable
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"state": self._state(), "consecutive_failures": self.failures}
+
+
+class LatencyTracker:
+    """Durations of recent successful calls, for percentile-based hedging"""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        with self.lock:
+            if not self.samples:
+                return None
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+
+class HedgedCall:
+    """
+    Runs a call and, if it hasn't finished once the `percentile` latency of
+    recent calls has passed, starts one duplicate; the first success wins.
+    The slower request is not cancelled (the HTTP client can't), so hedging
+    trades some extra provider load for a shorter tail.
+    """
+
+    def __init__(self, tracker: LatencyTracker, percentile: float = 95, min_samples: int = 20,
+                 max_workers: int = 8):
+        self.tracker = tracker
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _timed(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        started = time.monotonic()
+        result = func(*args, **kwargs)
+        self.tracker.record(time.monotonic() - started)
+        return result
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        threshold = self.tracker.percentile(self.percentile) if len(self.tracker) >= self.min_samples else None
+        if threshold is None:
+            return self._timed(func, *args, **kwargs)  # Still learning the latency distribution
+
+        primary = self.executor.submit(self._timed, func, *args, **kwargs)
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+
+        self.hedges += 1
+        hedge = self.executor.submit(self._timed, func, *args, **kwargs)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker for a provider ("github", "zai"), configured from Django settings"""
+    from django.conf import settings
+
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.CIRCUIT_BREAKER_RESET_SECONDS
+            )
+        return _breakers[name]
+
+
+def get_retry_policy() -> RetryPolicy:
+    from django.conf import settings
+
+    return RetryPolicy(
+        attempts=settings.RETRY_MAX_ATTEMPTS,
+        base_delay=settings.RETRY_BASE_DELAY_SECONDS,
+        max_delay=settings.RETRY_MAX_DELAY_SECONDS
+    )
+
+
+_default_hedger = None
+_default_hedger_lock = threading.Lock()
+
+
+def get_default_hedger() -> Optional[HedgedCall]:
+    """Process-wide hedging for Z AI calls (None when ZAI_HEDGE_ENABLED is off)"""
+    global _default_hedger
+    from django.conf import settings
+
+    if not settings.ZAI_HEDGE_ENABLED:
+        return None
+
+    with _default_hedger_lock:
+        if _default_hedger is None:
+            _default_hedger = HedgedCall(
+                LatencyTracker(),
+                percentile=settings.ZAI_HEDGE_PERCENTILE,
+                min_samples=settings.ZAI_HEDGE_MIN_SAMPLES
+            )
+        return _default_hedger
@@ -0,0 +1,70 @@
+import hashlib
+import uuid
+from typing import Any, Optional
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+
+# Bump when the cached payloads change shape, so old entries are never served
+RESULT_CACHE_VERSION = 1
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _cache_key(view_name: str, analysis_id: Any) -> Optional[str]:
+    try:
+        return f"analysis-result:{view_name}:{uuid.UUID(str(analysis_id))}"
+    except ValueError:
+        return None  # Not an analysis id; the view answers 404 as usual
+
+
+def _etag_matches(request, etag: str) -> bool:
+    header = request.META.get("HTTP_IF_NONE_MATCH")
+    if not header:
+        return False
+    candidates = parse_etags(header)
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+
+def _respond(request, etag: str, body: bytes) -> HttpResponse:
+    if _etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+def cached_result(request, view_name: str, analysis_id: Any) -> Optional[HttpResponse]:
+    """
+    Response for a completed analysis straight from the result cache, or None
+    on a miss. Runs before any database access: a matching If-None-Match is
+    answered with 304, anything else with the stored bytes.
+    """
+    key = _cache_key(view_name, analysis_id)
+    if key is None:
+        return None
+    entry = caches[settings.RESULT_CACHE_ALIAS].get(key, version=RESULT_CACHE_VERSION)
+    if entry is None:
+        return None
+    etag, body = entry
+    return _respond(request, etag, body)
+
+
+def cache_result(request, view_name: str, analysis_id: Any, data: Any) -> HttpResponse:
+    """
+    Render the result of a completed analysis once, store the bytes with a
+    strong ETag (hash of the body) and return them as an immutable response.
+    Only call this for completed analyses: their personality and insights
+    never change afterwards.
+    """
+    body = JSONRenderer().render(data)
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    key = _cache_key(view_name, analysis_id)
+    if key is not None:
+        caches[settings.RESULT_CACHE_ALIAS].set(key, (etag, body), version=RESULT_CACHE_VERSION)
+    return _respond(request, etag, body)
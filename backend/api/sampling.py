@@ -0,0 +1,175 @@
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Rough BPE behaviour: every identifier / number run and every punctuation
+# character is at least one token, long runs are split every ~4 characters
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local estimate of the LLM tokens in a piece of text"""
+    tokens = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        tokens += 1 + (match.end() - match.start() - 1) // 4
+    return tokens
+
+
+LANGUAGE_EXTENSIONS = {
+    "Python": {".py"},
+    "JavaScript": {".js", ".jsx", ".mjs"},
+    "TypeScript": {".ts", ".tsx"},
+    "Java": {".java"},
+    "C++": {".cpp", ".cc", ".hpp", ".h"},
+    "C": {".c", ".h"},
+    "Go": {".go"},
+    "Rust": {".rs"},
+    "PHP": {".php"},
+    "Ruby": {".rb"},
+    "Swift": {".swift"},
+    "Kotlin": {".kt"},
+    "Scala": {".scala"},
+    "Haskell": {".hs"},
+    "Clojure": {".clj"},
+}
+
+CODE_EXTENSIONS = set().union(*LANGUAGE_EXTENSIONS.values())
+
+
+def languages_from_blobs(blobs: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Bytes per language by file extension, for trees without a GitHub languages breakdown"""
+    languages = {}
+    for blob in blobs:
+        extension = os.path.splitext(blob.get("path", ""))[1].lower()
+        for language, extensions in LANGUAGE_EXTENSIONS.items():
+            if extension in extensions:
+                languages[language] = languages.get(language, 0) + (blob.get("size") or 0)
+                break
+    return dict(sorted(languages.items(), key=lambda item: item[1], reverse=True))
+
+README_NAMES = {"readme", "readme.md", "readme.rst", "readme.txt"}
+
+ENTRY_POINT_NAMES = {
+    "main.py", "__main__.py", "app.py", "manage.py", "cli.py", "wsgi.py",
+    "index.js", "index.ts", "main.js", "main.ts", "app.js", "app.ts", "server.js", "server.ts",
+    "main.go", "main.rs", "lib.rs", "main.c", "main.cpp", "main.swift", "main.kt",
+    "application.java", "main.java", "index.php", "application.rb",
+}
+
+LOW_VALUE_DIRECTORIES = {
+    "test", "tests", "spec", "specs", "__tests__", "testing", "e2e",
+    "vendor", "third_party", "thirdparty", "node_modules", "external", "deps",
+    "dist", "build", "target", "out", "generated", "migrations",
+    "docs", "examples", "example", "samples", "fixtures", "benchmarks",
+}
+
+CORE_DIRECTORIES = {"src", "lib", "app", "core", "pkg", "internal", "cmd"}
+
+
+class SampleSelector:
+    """
+    Chooses which repository files the analysis prompt gets to see.
+
+    Candidates are ranked from the tree alone (README, entry points, files of
+    the dominant languages, core modules ahead of tests / vendored /
+    generated code), then packed into a token budget: blob sizes give an
+    estimate up front so only files that can fit are downloaded, and
+    `pack` trims the downloaded text to what is left of the budget.
+    """
+
+    BYTES_PER_TOKEN = 4
+    MIN_FILE_BYTES = 200          # Stubs and empty __init__ files say little
+    MAX_FILE_BYTES = 512 * 1024   # Beyond this it is usually generated or data
+
+    def __init__(self, languages: Optional[Dict[str, int]] = None, token_budget: int = 6000,
+                 max_files: int = 8, max_file_tokens: int = 1500):
+        self.token_budget = token_budget
+        self.max_files = max_files
+        self.max_file_tokens = max_file_tokens
+
+        # Share of the code base per extension, from the GitHub languages breakdown
+        self.extension_weights = {}
+        total_bytes = sum((languages or {}).values())
+        for language, byte_count in (languages or {}).items():
+            for extension in LANGUAGE_EXTENSIONS.get(language, ()):
+                share = byte_count / total_bytes if total_bytes else 0
+                self.extension_weights[extension] = max(self.extension_weights.get(extension, 0), share)
+
+    def score(self, path: str, size: Optional[int]) -> Optional[float]:
+        """Relevance of one file for the prompt, None if it should not be sampled"""
+        parts = path.lower().split("/")
+        name = parts[-1]
+        directories = parts[:-1]
+        extension = os.path.splitext(name)[1]
+
+        if any(part.startswith(".") for part in parts) or len(path) >= 100:
+            return None  # Hidden files and very long paths
+        if name in README_NAMES:
+            return 10.0 if not directories else None
+        if extension not in CODE_EXTENSIONS or ".min." in name:
+            return None
+        if size is not None and not self.MIN_FILE_BYTES <= size <= self.MAX_FILE_BYTES:
+            return None
+
+        score = 1.0 + 4.0 * self.extension_weights.get(extension, 0)
+        if name in ENTRY_POINT_NAMES:
+            score += 4.0
+        if any(directory in LOW_VALUE_DIRECTORIES for directory in directories) \
+                or name.startswith("test_") or re.search(r"[._-](test|spec)\.\w+$", name):
+            score -= 3.0
+        if directories and directories[0] in CORE_DIRECTORIES:
+            score += 1.5
+        # Shallow files tend to be the ones the rest of the code hangs off
+        score -= 0.3 * len(directories)
+        return score
+
+    def rank(self, blobs: List[Dict[str, Any]]) -> List[Tuple[str, Optional[int]]]:
+        """Samplable (path, size) pairs, most relevant first"""
+        scored = []
+        for blob in blobs:
+            score = self.score(blob["path"], blob.get("size"))
+            if score is not None:
+                scored.append((score, blob["path"], blob.get("size")))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(path, size) for _, path, size in scored]
+
+    def select(self, blobs: List[Dict[str, Any]]) -> List[str]:
+        """Paths worth downloading: top ranked files whose estimated size fits the budget"""
+        selected = []
+        remaining = self.token_budget
+        for path, size in self.rank(blobs):
+            if len(selected) >= self.max_files or remaining <= 0:
+                break
+            # Unknown sizes are assumed to fill a whole per-file allowance
+            estimated = size // self.BYTES_PER_TOKEN if size is not None else self.max_file_tokens
+            selected.append(path)
+            remaining -= min(estimated, self.max_file_tokens)
+        return selected
+
+    def pack(self, selected: List[str], contents: Dict[str, str]) -> Dict[str, str]:
+        """Trim downloaded files, in rank order, to the token budget"""
+        packed = {}
+        remaining = self.token_budget
+        for path in selected:
+            if path not in contents or remaining <= 0:
+                continue
+            text = self.truncate(contents[path], min(self.max_file_tokens, remaining))
+            remaining -= estimate_tokens(text)
+            packed[path] = text
+        return packed
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text at a line boundary so it stays within max_tokens"""
+        if estimate_tokens(text) <= max_tokens:
+            return text
+
+        lines = []
+        used = 0
+        for line in text.splitlines(keepends=True):
+            line_tokens = estimate_tokens(line)
+            if used + line_tokens > max_tokens:
+                break
+            lines.append(line)
+            used += line_tokens
+        return "".join(lines) + "\n... (truncated)"
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from repositories.models import Repository
-from analyses.models import Analysis
+from django.db.models import Count
+from analyses.models import Analysis, AnalysisBatch
 from personalities.models import Personality, CodeInsight
 
 
@@ -17,8 +18,8 @@ class AnalysisSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Analysis
-        fields = ['id', 'repository', 'status', 'error_message', 'file_count', 
-                 'line_count', 'commit_count', 'top_languages', 'analysis_metadata',
+        fields = ['id', 'repository', 'status', 'stage', 'error_message', 'file_count', 
+                 'line_count', 'commit_count', 'head_sha', 'top_languages', 'analysis_metadata',
                  'created_at', 'completed_at']
         read_only_fields = ['id', 'created_at', 'completed_at']
 
@@ -52,4 +53,69 @@ class PersonalityDetailSerializer(serializers.ModelSerializer):
                  'performance_score', 'primary_color', 'secondary_color', 
                  'accent_color', 'shape_type', 'complexity_level', 'rotation_speed',
                  'particle_count', 'personality_description', 'tags', 'insights', 'created_at']
-        read_only_fields = ['id', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at']
+
+
+class AnalysisResultSerializer(AnalysisSerializer):
+    """
+    Analysis with its personality and insights in one payload. Expects the
+    personality select_related and its insights prefetched.
+    """
+    progress = serializers.IntegerField(read_only=True)
+    personality = serializers.SerializerMethodField()
+
+    class Meta(AnalysisSerializer.Meta):
+        fields = AnalysisSerializer.Meta.fields + ['progress', 'personality']
+        read_only_fields = fields
+
+    def get_personality(self, obj):
+        try:
+            personality = obj.personality
+        except Personality.DoesNotExist:
+            return None
+        return PersonalityDetailSerializer(personality).data
+
+
+class AnalysisBatchSerializer(serializers.ModelSerializer):
+    """Aggregate progress of a bulk analysis, plus a compact row per repository"""
+    summary = serializers.SerializerMethodField()
+    analyses = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AnalysisBatch
+        fields = ['id', 'requested_count', 'invalid_urls', 'summary', 'analyses', 'created_at']
+        read_only_fields = fields
+
+    def get_summary(self, obj):
+        by_stage = {
+            row['stage']: row['count']
+            for row in obj.analyses.values('stage').annotate(count=Count('id'))
+        }
+        total = sum(by_stage.values())
+        finished = sum(by_stage.get(stage, 0) for stage in Analysis.TERMINAL_STAGES)
+        progress = sum(
+            (100 if stage in Analysis.TERMINAL_STAGES else Analysis.STAGE_PROGRESS.get(stage, 0)) * count
+            for stage, count in by_stage.items()
+        )
+        return {
+            'total': total,
+            'completed': by_stage.get('completed', 0),
+            'failed': by_stage.get('failed', 0),
+            'in_progress': total - finished,
+            'by_stage': by_stage,
+            'progress': round(progress / total) if total else 100,
+            'done': finished == total
+        }
+
+    def get_analyses(self, obj):
+        return [
+            {
+                'analysis_id': str(row['id']),
+                'repo_url': row['repository__repo_url'],
+                'status': row['status'],
+                'stage': row['stage']
+            }
+            for row in obj.analyses.order_by('repository__repo_url').values(
+                'id', 'repository__repo_url', 'status', 'stage'
+            )
+        ]
@@ -0,0 +1,151 @@
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .heuristics import TRAITS
+
+
+METRICS = ("cosine", "euclidean")
+
+
+class TraitIndex:
+    """
+    In-memory nearest-neighbour index over personality trait vectors.
+
+    Holds one row per repository (its latest completed personality) in a
+    float32 matrix and answers top-k queries with a single vectorized scan,
+    a few milliseconds even at hundreds of thousands of repositories. The
+    first query loads every completed personality; later queries pull in
+    only analyses completed since the last refresh, at most every
+    `refresh_interval` seconds.
+    """
+
+    # Completions are timestamped before their transaction commits, so each
+    # refresh re-reads a short window before the watermark to catch late commits
+    REFRESH_OVERLAP = timedelta(seconds=120)
+
+    def __init__(self, refresh_interval: float = 30):
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.vectors = np.zeros((0, len(TRAITS)), dtype=np.float32)
+        self.unit_vectors = np.zeros((0, len(TRAITS)), dtype=np.float32)
+        self.squared_norms = np.zeros(0, dtype=np.float32)
+        self.size = 0
+        self.personality_ids: List[str] = []
+        self.repository_ids: List[str] = []
+        self.completed_at: List[Any] = []
+        self.rows: Dict[str, int] = {}  # repository id -> row
+        self.watermark = None
+        self.refreshed_at = None
+
+    def refresh(self, force: bool = False):
+        """Load analyses completed since the last refresh (everything on first use)"""
+        with self.lock:
+            if not force and self.refreshed_at is not None \
+                    and time.monotonic() - self.refreshed_at < self.refresh_interval:
+                return
+            self._load()
+            self.refreshed_at = time.monotonic()
+
+    def _load(self):
+        from personalities.models import Personality
+
+        queryset = Personality.objects.filter(analysis__status='completed', analysis__completed_at__isnull=False)
+        for trait in TRAITS:
+            queryset = queryset.exclude(**{f"{trait}_score__isnull": True})
+        if self.watermark is not None:
+            queryset = queryset.filter(analysis__completed_at__gte=self.watermark - self.REFRESH_OVERLAP)
+
+        rows = queryset.order_by('analysis__completed_at').values_list(
+            'id', 'analysis__repository_id', 'analysis__completed_at', *[f"{trait}_score" for trait in TRAITS]
+        )
+        for personality_id, repository_id, completed_at, *scores in rows.iterator(chunk_size=5000):
+            self._upsert(str(personality_id), str(repository_id), completed_at, scores)
+            if self.watermark is None or completed_at > self.watermark:
+                self.watermark = completed_at
+
+    def _upsert(self, personality_id: str, repository_id: str, completed_at, scores):
+        row = self.rows.get(repository_id)
+        if row is not None and self.completed_at[row] >= completed_at:
+            return  # Already holds this or a newer analysis of the repository
+
+        if row is None:
+            row = self.size
+            if row == len(self.vectors):
+                # Grow by doubling so incremental inserts stay amortized O(1)
+                capacity = max(1024, 2 * len(self.vectors))
+                for name in ("vectors", "unit_vectors", "squared_norms"):
+                    current = getattr(self, name)
+                    grown = np.zeros((capacity,) + current.shape[1:], dtype=np.float32)
+                    grown[:row] = current[:row]
+                    setattr(self, name, grown)
+            self.size += 1
+            self.rows[repository_id] = row
+            self.personality_ids.append(personality_id)
+            self.repository_ids.append(repository_id)
+            self.completed_at.append(completed_at)
+        else:
+            self.personality_ids[row] = personality_id
+            self.completed_at[row] = completed_at
+
+        vector = np.array([float(score) for score in scores], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        self.vectors[row] = vector
+        self.unit_vectors[row] = vector / norm if norm else vector
+        self.squared_norms[row] = norm * norm
+
+    def query(self, vector: List[float], k: int = 10, metric: str = "cosine",
+              exclude_repository: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Top-k (personality id, score) pairs closest to `vector`. Scores are
+        cosine similarity (higher is closer) or Euclidean distance (lower is
+        closer).
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric} (expected one of {', '.join(METRICS)})")
+        self.refresh()
+
+        with self.lock:
+            size = self.size
+            query = np.asarray(vector, dtype=np.float32)
+            if metric == "cosine":
+                norm = np.linalg.norm(query)
+                scores = self.unit_vectors[:size] @ (query / norm if norm else query)
+                order_key = -scores
+            else:
+                # |v - q|^2 = |v|^2 - 2 v.q + |q|^2, a matrix-vector product instead of a subtraction per row
+                squared = self.squared_norms[:size] - 2 * (self.vectors[:size] @ query) + query @ query
+                scores = np.sqrt(np.maximum(squared, 0))
+                order_key = scores.copy()
+
+            excluded = self.rows.get(exclude_repository) if exclude_repository else None
+            if excluded is not None:
+                order_key[excluded] = np.inf
+                size -= 1
+            k = min(k, size)
+            if k <= 0:
+                return []
+
+            top = np.argpartition(order_key, k - 1)[:k]
+            top = top[np.argsort(order_key[top])]
+            return [(self.personality_ids[row], round(float(scores[row]), 4)) for row in top]
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"repositories": self.size, "watermark": self.watermark}
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_default_trait_index() -> TraitIndex:
+    """Process-wide trait index configured from Django settings"""
+    global _default_index
+    from django.conf import settings
+
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = TraitIndex(refresh_interval=settings.SIMILARITY_REFRESH_SECONDS)
+        return _default_index
@@ -1,31 +1,112 @@
-import threading
-import time
 import os
-import uuid
-from typing import Dict, Any
+from datetime import timedelta
+from typing import Callable, Dict, Any, List, Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
+from .git_mirror import get_default_mirror_cache
+from .github_cache import get_default_cache
 from .github_client import GitHubClient
+from .events import publish, set_stage, stage_payload
+from .github_tokens import get_default_token_pool
+from .heuristics import repository_metrics, score_repository
+from .llm_cache import get_default_llm_cache
+from .llm_gateway import get_default_gateway
+from .resilience import get_circuit_breaker, get_default_hedger, get_retry_policy
+from .sampling import estimate_tokens
 from .zai_client import ZAIClient
 from repositories.models import Repository
-from analyses.models import Analysis
+from analyses.models import Analysis, AnalysisJob
 from personalities.models import Personality, CodeInsight
 
 
-class AnalysisTask:
-    def __init__(self):
-        self.active_tasks = {}
-        self.lock = threading.Lock()
+def personality_fields(section: str, value: Any) -> Dict[str, Any]:
+    """Personality columns filled by one top-level section of the Z AI result"""
+    if section == "traits":
+        return {
+            "complexity_score": value.get("complexity"),
+            "creativity_score": value.get("creativity"),
+            "maintainability_score": value.get("maintainability"),
+            "innovation_score": value.get("innovation"),
+            "organization_score": value.get("organization"),
+            "performance_score": value.get("performance"),
+        }
+    if section == "visualization":
+        colors = value.get("colors", {})
+        shape = value.get("shape", {})
+        return {
+            "primary_color": colors.get("primary"),
+            "secondary_color": colors.get("secondary"),
+            "accent_color": colors.get("accent"),
+            "shape_type": shape.get("type", "sphere"),
+            "complexity_level": shape.get("complexity", 5),
+            "rotation_speed": shape.get("rotation_speed", 1.0),
+            "particle_count": shape.get("particle_count", 50),
+        }
+    if section == "description":
+        return {"personality_description": value or ""}
+    if section == "tags":
+        return {"tags": value or []}
+    return {}
+
+
+def result_personality_fields(zai_result: Dict[str, Any]) -> Dict[str, Any]:
+    """All Personality columns for a complete Z AI result"""
+    fields = {}
+    for section, default in (("traits", {}), ("visualization", {}), ("description", ""), ("tags", [])):
+        fields.update(personality_fields(section, zai_result.get(section, default)))
+    return fields
+
+
+def build_insights(personality: Personality, insights: List[Dict[str, Any]]) -> List[CodeInsight]:
+    """Unsaved CodeInsight rows for the insights section of a Z AI result"""
+    return [
+        CodeInsight(
+            personality=personality,
+            category=insight_data.get("category", "patterns"),
+            insight_text=insight_data.get("text", ""),
+            severity=insight_data.get("severity", "info")
+        )
+        for insight_data in insights
+    ]
 
-    def analyze_repository_task(self, analysis_id: str, repo_url: str):
+
+def create_insights(personality: Personality, insights: List[Dict[str, Any]]):
+    CodeInsight.objects.bulk_create(build_insights(personality, insights))
+
+
+def create_github_client(interactive: bool = False) -> GitHubClient:
+    """
+    GitHubClient wired to the shared token pool and caches from settings.
+    Interactive clients (used inside HTTP requests) fail fast instead of
+    waiting for a rate-limit reset.
+    """
+    if not settings.GITHUB_TOKENS:
+        raise ValueError("GITHUB_TOKEN not found in environment")
+
+    return GitHubClient(
+        settings.GITHUB_TOKENS[0],
+        cache=get_default_cache(),
+        mirror_cache=get_default_mirror_cache(),
+        token_pool=get_default_token_pool(interactive)
+    )
+
+
+class AnalysisTask:
+    def analyze_repository_task(self, analysis_id: str, repo_url: str,
+                                seed_repository: Optional[Dict[str, Any]] = None):
         """
         Async task to analyze a repository
+
+        `seed_repository` is repository metadata the enqueuer already fetched
+        (an owner listing entry); it replaces the /repos/{owner}/{repo} call.
         """
         try:
             # Get API keys from environment
-            github_token = os.getenv('GITHUB_TOKEN')
             zai_api_key = os.getenv('Z_AI_API_KEY')
             
-            if not github_token:
+            if not settings.GITHUB_TOKENS:
                 raise ValueError("GITHUB_TOKEN not found in environment")
             
             if not zai_api_key:
@@ -33,21 +114,37 @@ class AnalysisTask:
             
             # Get analysis record
             try:
-                analysis = Analysis.objects.get(id=analysis_id)
+                analysis = Analysis.objects.select_related('repository').get(id=analysis_id)
             except Analysis.DoesNotExist:
                 raise ValueError(f"Analysis with ID {analysis_id} not found")
             
             # Update status to processing
             analysis.status = 'processing'
-            analysis.save()
+            analysis.save(update_fields=['status'])
             
             # Initialize clients
-            github_client = GitHubClient(github_token)
-            zai_client = ZAIClient(zai_api_key)
+            github_client = create_github_client()
+            zai_client = ZAIClient(
+                zai_api_key,
+                gateway=get_default_gateway(),
+                cache=get_default_llm_cache()
+            )
+            
+            # Transient provider errors are retried per stage instead of failing the analysis
+            retry = get_retry_policy()
             
             # Step 1: Fetch repository data from GitHub
+            set_stage(analysis, 'github_fetch')
             try:
-                repository_data = github_client.fetch_repository(repo_url)
+                fetch_context = github_client.create_fetch_context(
+                    repo_url,
+                    commit_history_limit=settings.GITHUB_COMMIT_HISTORY_LIMIT,
+                    repository=seed_repository
+                )
+                repository_data = retry.call(
+                    get_circuit_breaker("github").call,
+                    github_client.fetch_repository, repo_url, context=fetch_context
+                )
             except Exception as e:
                 raise ValueError(f"GitHub API error: {str(e)}")
             
@@ -60,147 +157,333 @@ class AnalysisTask:
             repository.forks_count = repo_info.get("forks_count", 0)
             repository.language = repo_info.get("language") or repository.language
             repository.last_analyzed_at = timezone.now()
-            repository.save()
+            repository.save(update_fields=[
+                'description', 'stars_count', 'forks_count', 'language', 'last_analyzed_at', 'updated_at'
+            ])
             
             # Update analysis with basic stats
             analysis.file_count = repository_data.get("file_count", 0)
             analysis.commit_count = repository_data.get("commit_count", 0)
+            analysis.head_sha = repository_data.get("head_sha")
             analysis.top_languages = repository_data.get("top_languages", {})
+            # Instant structural estimate: a preview while the LLM runs, and the fallback if it fails
+            heuristic_result = score_repository(
+                repository_metrics(fetch_context.blobs, repository_data.get("languages_raw", {}))
+            )
             analysis.analysis_metadata = {
+                "heuristic_preview": {
+                    "traits": heuristic_result["traits"],
+                    "visualization": heuristic_result["visualization"]
+                },
                 "github_api_response": {
                     "full_name": repo_info.get("full_name"),
                     "default_branch": repo_info.get("default_branch"),
                     "size": repo_info.get("size"),
                     "open_issues_count": repo_info.get("open_issues_count"),
                     "license": repo_info.get("license", {}).get("name") if repo_info.get("license") else None
-                }
+                },
+                "commit_stats": repository_data.get("commit_stats", {})
             }
-            analysis.save()
+            analysis.save(update_fields=[
+                'file_count', 'commit_count', 'head_sha', 'top_languages', 'analysis_metadata'
+            ])
             
             # Step 2: Get sample files for AI analysis
+            set_stage(analysis, 'sampling')
             try:
-                sample_files = github_client.get_repository_files_sample(repo_url, max_files=3)
+                sample_files = github_client.get_repository_files_sample(
+                    repo_url,
+                    max_files=settings.GITHUB_SAMPLE_MAX_FILES,
+                    context=fetch_context,
+                    concurrency=settings.GITHUB_SAMPLE_CONCURRENCY,
+                    deadline=settings.GITHUB_SAMPLE_DEADLINE_SECONDS,
+                    mode=settings.GITHUB_INGESTION_MODE,
+                    token_budget=settings.ANALYSIS_PROMPT_TOKEN_BUDGET,
+                    max_file_tokens=settings.ANALYSIS_SAMPLE_MAX_FILE_TOKENS
+                )
             except Exception as e:
                 # Log warning but continue
                 print(f"Warning: Could not get sample files: {str(e)}")
                 sample_files = {}
             
-            # Step 3: Analyze with Z AI
+            # Step 3: Analyze with Z AI, persisting sections as they stream in
+            set_stage(analysis, 'llm')
+            streamed_sections = []
+            on_section = self.make_section_writer(analysis, zai_client, streamed_sections)
             try:
-                zai_result = zai_client.analyze_repository_with_zai(repository_data, sample_files)
+                zai_result = retry.call(
+                    get_circuit_breaker("zai").call,
+                    self.request_zai_analysis, zai_client, repository_data, sample_files, on_section
+                )
                 
                 # Validate the response
                 if not zai_client.validate_response(zai_result):
                     raise ValueError("Invalid response structure from Z AI API")
                 
+                scored_by = "zai"
+                
             except Exception as e:
-                raise ValueError(f"Z AI analysis failed: {str(e)}")
-            
-            # Step 4: Create personality record
-            traits = zai_result.get("traits", {})
-            visualization = zai_result.get("visualization", {})
-            colors = visualization.get("colors", {})
-            shape = visualization.get("shape", {})
+                if not settings.HEURISTIC_FALLBACK_ENABLED:
+                    raise ValueError(f"Z AI analysis failed: {str(e)}")
+                print(f"Warning: Z AI analysis failed, using heuristic scores: {str(e)}")
+                analysis.analysis_metadata["llm_error"] = str(e)
+                zai_result = heuristic_result
+                scored_by = "heuristic"
             
-            personality = Personality.objects.create(
-                analysis=analysis,
-                complexity_score=traits.get("complexity"),
-                creativity_score=traits.get("creativity"),
-                maintainability_score=traits.get("maintainability"),
-                innovation_score=traits.get("innovation"),
-                organization_score=traits.get("organization"),
-                performance_score=traits.get("performance"),
-                primary_color=colors.get("primary"),
-                secondary_color=colors.get("secondary"),
-                accent_color=colors.get("accent"),
-                shape_type=shape.get("type", "sphere"),
-                complexity_level=shape.get("complexity", 5),
-                rotation_speed=shape.get("rotation_speed", 1.0),
-                particle_count=shape.get("particle_count", 50),
-                personality_description=zai_result.get("description", ""),
-                tags=zai_result.get("tags", [])
-            )
+            set_stage(analysis, 'persist')
             
-            # Step 5: Create code insights
-            insights = zai_result.get("insights", [])
-            for insight_data in insights:
-                CodeInsight.objects.create(
-                    personality=personality,
-                    category=insight_data.get("category", "patterns"),
-                    insight_text=insight_data.get("text", ""),
-                    severity=insight_data.get("severity", "info")
+            # Record how much GitHub rate-limit budget and LLM time the caches saved
+            analysis.analysis_metadata["github_cache"] = github_client.cache_stats()
+            analysis.analysis_metadata["llm_cache_hit"] = zai_client.last_cache_hit
+            analysis.analysis_metadata["scored_by"] = scored_by
+            # Which files the prompt saw, with their estimated token cost
+            analysis.analysis_metadata["prompt_samples"] = {
+                path: estimate_tokens(content) for path, content in sample_files.items()
+            }
+
+            # Step 4: Personality, insights and the completed analysis commit together,
+            # so a crash never leaves a half-written result behind
+            with transaction.atomic():
+                if scored_by == "heuristic":
+                    # Don't mix partially streamed LLM sections into the heuristic result
+                    Personality.objects.filter(analysis=analysis).delete()
+                    streamed_sections.clear()
+                if streamed_sections:
+                    analysis.analysis_metadata["streamed_sections"] = list(streamed_sections)
+                
+                # Create (or complete the streamed) personality record
+                personality, _ = Personality.objects.update_or_create(
+                    analysis=analysis,
+                    defaults=result_personality_fields(zai_result)
                 )
-            
-            # Mark analysis as completed
-            analysis.status = 'completed'
-            analysis.completed_at = timezone.now()
-            analysis.save()
+                
+                # Step 5: Create code insights
+                if "insights" not in streamed_sections:
+                    create_insights(personality, zai_result.get("insights", []))
+                
+                # Mark analysis as completed
+                analysis.status = 'completed'
+                analysis.stage = 'completed'
+                analysis.completed_at = timezone.now()
+                analysis.save(update_fields=['status', 'stage', 'completed_at', 'analysis_metadata'])
+                # Delivered to listeners on commit
+                publish(analysis.id, stage_payload(analysis))
             
         except Exception as e:
             # Mark analysis as failed
             try:
-                analysis = Analysis.objects.get(id=analysis_id)
-                analysis.status = 'failed'
-                analysis.error_message = str(e)
-                analysis.save()
+                analysis = Analysis.objects.only('id', 'status', 'stage').get(id=analysis_id)
+                with transaction.atomic():
+                    analysis.status = 'failed'
+                    analysis.stage = 'failed'
+                    analysis.error_message = str(e)
+                    analysis.save(update_fields=['status', 'stage', 'error_message'])
+                    # Drop sections persisted while streaming, the result is incomplete
+                    Personality.objects.filter(analysis=analysis).delete()
+                    publish(analysis.id, stage_payload(analysis))
             except Analysis.DoesNotExist:
                 pass  # Already handled above
             
             # Re-raise the exception
             raise
 
-    def start_analysis_task(self, analysis_id: str, repo_url: str) -> threading.Thread:
+    def request_zai_analysis(self, zai_client: ZAIClient, repository_data: Dict[str, Any],
+                             sample_files: Dict[str, str],
+                             on_section: Callable[[str, Any], None]) -> Dict[str, Any]:
+        """One Z AI call, hedged when enabled"""
+        hedger = get_default_hedger()
+        if hedger is None or settings.ZAI_STREAMING:
+            return zai_client.analyze_repository_with_zai(
+                repository_data,
+                sample_files,
+                on_section=on_section,
+                stream=settings.ZAI_STREAMING
+            )
+        # Duplicate requests must not write sections twice, so hedged calls only return the result
+        return hedger.call(zai_client.analyze_repository_with_zai, repository_data, sample_files)
+
+    def make_section_writer(self, analysis: Analysis, zai_client: ZAIClient,
+                            streamed_sections: List[str]) -> Callable[[str, Any], None]:
         """
-        Start analysis task in a background thread
+        Callback that writes each completed section of a streamed Z AI result
+        onto the Personality / CodeInsight rows right away
         """
-        def task_wrapper():
+        def on_section(section: str, value: Any):
+            if section == "traits" and not zai_client.validate_traits(value):
+                return  # Left to the final validation
+
+            if section == "insights":
+                with transaction.atomic():
+                    personality, _ = Personality.objects.get_or_create(analysis=analysis)
+                    # A retried completion streams its sections again
+                    CodeInsight.objects.filter(personality=personality).delete()
+                    create_insights(personality, value)
+            else:
+                fields = personality_fields(section, value)
+                if not fields:
+                    return
+                Personality.objects.update_or_create(analysis=analysis, defaults=fields)
+
+            # Recorded in analysis_metadata by the final save
+            if section not in streamed_sections:
+                streamed_sections.append(section)
+
+        return on_section
+
+    def enqueue_analysis(self, analysis_id: str, repo_url: str,
+                         priority: int = AnalysisJob.PRIORITY_INTERACTIVE,
+                         payload: Optional[Dict[str, Any]] = None) -> AnalysisJob:
+        """
+        Persist an analysis job so any worker node can pick it up
+        """
+        job, _ = AnalysisJob.objects.get_or_create(
+            analysis_id=analysis_id,
+            defaults={
+                'repo_url': repo_url,
+                'max_attempts': settings.ANALYSIS_JOB_MAX_ATTEMPTS,
+                'priority': priority,
+                'payload': payload or {}
+            }
+        )
+        return job
+
+    def enqueue_analyses(self, analyses: List[Analysis],
+                         priority: int = AnalysisJob.PRIORITY_BULK,
+                         payloads: Optional[Dict[Any, Dict[str, Any]]] = None) -> List[AnalysisJob]:
+        """
+        Queue many analyses with one insert. They share the worker pool, and
+        with it the GitHub token pool and the LLM gateway, with everything else.
+
+        `payloads` maps repository ids to job payloads.
+        """
+        payloads = payloads or {}
+        return AnalysisJob.objects.bulk_create([
+            AnalysisJob(
+                analysis=analysis,
+                repo_url=analysis.repository.repo_url,
+                max_attempts=settings.ANALYSIS_JOB_MAX_ATTEMPTS,
+                priority=priority,
+                payload=payloads.get(analysis.repository_id, {})
+            )
+            for analysis in analyses
+        ])
+
+    def lease_next_job(self, worker_id: str, lease_seconds: int) -> Optional[AnalysisJob]:
+        """
+        Lease the oldest runnable job of the highest priority with
+        SELECT ... FOR UPDATE SKIP LOCKED.
+
+        Jobs whose lease expired (the worker holding them died) are picked up
+        again until they run out of attempts.
+        """
+        while True:
+            now = timezone.now()
+            with transaction.atomic():
+                job = (
+                    AnalysisJob.objects
+                    .select_for_update(skip_locked=True)
+                    .filter(Q(status='queued') | Q(status='running', leased_until__lt=now))
+                    .order_by('-priority', 'created_at')
+                    .first()
+                )
+                if job is None:
+                    return None
+
+                if job.attempts >= job.max_attempts:
+                    # Lease expired on the last attempt, give up on this job
+                    job.status = 'failed'
+                    job.last_error = job.last_error or 'Worker lease expired too many times'
+                    job.lease_owner = None
+                    job.leased_until = None
+                    job.save(update_fields=['status', 'last_error', 'lease_owner', 'leased_until', 'updated_at'])
+                    failed = Analysis.objects.filter(id=job.analysis_id).exclude(status='completed').update(
+                        status='failed',
+                        stage='failed',
+                        error_message=job.last_error,
+                        completed_at=now
+                    )
+                    if failed:
+                        # Ends open event streams; delivered when the transaction commits
+                        publish(job.analysis_id, stage_payload(
+                            Analysis(id=job.analysis_id, status='failed', stage='failed')
+                        ))
+                    continue
+
+                job.status = 'running'
+                job.attempts += 1
+                job.lease_owner = worker_id
+                job.leased_until = now + timedelta(seconds=lease_seconds)
+                job.save(update_fields=['status', 'attempts', 'lease_owner', 'leased_until', 'updated_at'])
+                return job
+
+    def extend_leases(self, job_ids: List[str], worker_id: str, lease_seconds: int) -> int:
+        """
+        Heartbeat for jobs still being processed by this worker
+        """
+        if not job_ids:
+            return 0
+        return AnalysisJob.objects.filter(
+            id__in=job_ids,
+            status='running',
+            lease_owner=worker_id
+        ).update(leased_until=timezone.now() + timedelta(seconds=lease_seconds))
+
+    def run_job(self, job: AnalysisJob, worker_id: str):
+        """
+        Run a leased job and record its outcome
+        """
+        analysis = Analysis.objects.only('id', 'status', 'error_message').filter(id=job.analysis_id).first()
+        if analysis is not None and analysis.status in ('completed', 'failed'):
+            # A previous attempt finished the analysis but died before closing the job;
+            # completed results never change, so there is nothing to redo
+            final_status = 'done' if analysis.status == 'completed' else 'failed'
+            last_error = analysis.error_message if final_status == 'failed' else None
+        else:
+            if job.attempts > 1:
+                # A previous attempt may have died half way through persisting
+                Personality.objects.filter(analysis_id=job.analysis_id).delete()
+
             try:
-                self.analyze_repository_task(analysis_id, repo_url)
+                self.analyze_repository_task(
+                    str(job.analysis_id), job.repo_url, seed_repository=job.payload.get('repository')
+                )
             except Exception as e:
-                print(f"Analysis task failed for {analysis_id}: {str(e)}")
-            finally:
-                # Clean up task tracking
-                with self.lock:
-                    if analysis_id in self.active_tasks:
-                        del self.active_tasks[analysis_id]
-        
-        thread = threading.Thread(target=task_wrapper, daemon=True)
-        thread.start()
-        
-        # Track the task
-        with self.lock:
-            self.active_tasks[analysis_id] = {
-                'thread': thread,
-                'start_time': timezone.now(),
-                'repo_url': repo_url
-            }
-        
-        return thread
+                print(f"Analysis task failed for {job.analysis_id}: {str(e)}")
+                final_status, last_error = 'failed', str(e)
+            else:
+                final_status, last_error = 'done', None
+
+        AnalysisJob.objects.filter(id=job.id, lease_owner=worker_id).update(
+            status=final_status,
+            last_error=last_error,
+            lease_owner=None,
+            leased_until=None,
+            updated_at=timezone.now()
+        )
 
     def get_task_status(self, analysis_id: str) -> Dict[str, Any]:
         """
         Get status of an analysis task
         """
-        with self.lock:
-            if analysis_id not in self.active_tasks:
-                return {'status': 'not_found'}
-            
-            task_info = self.active_tasks[analysis_id]
-            thread = task_info['thread']
-            
-            return {
-                'status': 'running' if thread.is_alive() else 'completed',
-                'start_time': task_info['start_time'],
-                'repo_url': task_info['repo_url']
-            }
+        job = AnalysisJob.objects.filter(analysis_id=analysis_id).first()
+        if job is None:
+            return {'status': 'not_found'}
+
+        return {
+            'status': job.status,
+            'attempts': job.attempts,
+            'lease_owner': job.lease_owner,
+            'start_time': job.created_at,
+            'repo_url': job.repo_url
+        }
 
 
 # Global task manager instance
 task_manager = AnalysisTask()
 
 
-def analyze_repository_task(analysis_id: str, repo_url: str):
+def analyze_repository_task(analysis_id: str, repo_url: str) -> AnalysisJob:
     """
-    Public function to start repository analysis task
+    Public function to queue a repository analysis for the worker pool
     """
-    return task_manager.start_analysis_task(analysis_id, repo_url)
\ No newline at end of file
+    return task_manager.enqueue_analysis(analysis_id, repo_url)
@@ -0,0 +1,110 @@
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest import mock, skipUnless
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from repositories.models import Repository
+from analyses.models import Analysis
+from personalities.models import Personality, CodeInsight
+from .git_mirror import GitMirrorCache
+from .github_client import GitHubClient
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'results': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-results'},
+})
+class AnalysisResultTests(TestCase):
+    def setUp(self):
+        caches['results'].clear()
+        self.client = APIClient()
+        repository = Repository.objects.create(
+            repo_url='https://github.com/octocat/Hello-World',
+            repo_name='Hello-World',
+            owner='octocat'
+        )
+        self.analysis = Analysis.objects.create(repository=repository, status='completed', stage='completed')
+        personality = Personality.objects.create(analysis=self.analysis, complexity_score=0.5, shape_type='cube')
+        CodeInsight.objects.bulk_create([
+            CodeInsight(personality=personality, category='patterns', insight_text='Small modules'),
+            CodeInsight(personality=personality, category='strengths', insight_text='Clear naming'),
+        ])
+        self.url = f'/api/v1/analyses/{self.analysis.id}/result/'
+
+    def test_result_loads_in_two_queries(self):
+        # Analysis joined with repository and personality, then the insights
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['progress'], 100)
+        self.assertEqual(data['personality']['shape_type'], 'cube')
+        self.assertEqual(len(data['personality']['insights']), 2)
+
+    def test_result_without_personality_is_null(self):
+        self.analysis.personality.delete()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()['personality'])
+
+    def test_if_none_match_is_answered_from_cache(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('immutable', response['Cache-Control'])
+
+
+@skipUnless(shutil.which('git'), 'git is not installed')
+class LocalMirrorFetchTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        source = os.path.join(self.directory, 'octocat', 'hello-world')
+        os.makedirs(os.path.join(source, 'src'))
+        with open(os.path.join(source, 'README.md'), 'w') as readme:
+            readme.write('# Hello world\n' + 'A small example project.\n' * 20)
+        with open(os.path.join(source, 'src', 'app.py'), 'w') as module:
+            module.write(''.join(f'def handler_{index}():\n    return {index}\n\n' for index in range(20)))
+        self.git(source, 'init', '-q', '-b', 'main')
+        self.git(source, 'add', '.')
+        self.git(source, 'commit', '-q', '-m', 'Initial commit')
+        self.git(source, 'commit', '-q', '--allow-empty', '-m', 'Second commit')
+
+        self.repo_url = f'file://{source}'
+        cache = GitMirrorCache(os.path.join(self.directory, 'mirrors'), max_bytes=10 * 1024 * 1024)
+        self.client = GitHubClient('unused-token', mirror_cache=cache)
+
+    def git(self, cwd, *args):
+        subprocess.run(
+            ['git', '-c', 'user.name=Octocat', '-c', 'user.email=octocat@example.com', *args],
+            cwd=cwd, check=True, capture_output=True
+        )
+
+    def test_fetch_and_sample_without_network(self):
+        with mock.patch.object(self.client.session, 'request', side_effect=AssertionError('network used')):
+            context = self.client.create_fetch_context(self.repo_url)
+            data = self.client.fetch_repository(self.repo_url, context=context)
+            samples = self.client.get_repository_files_sample(self.repo_url, context=context)
+
+        self.assertEqual(data['repository']['full_name'], 'octocat/hello-world')
+        self.assertEqual(data['repository']['default_branch'], 'main')
+        self.assertEqual(data['repository']['language'], 'Python')
+        self.assertEqual(data['commit_count'], 2)
+        self.assertEqual(data['file_count'], 2)
+        self.assertEqual(data['top_languages'], {'Python': 100.0})
+        self.assertEqual(len(data['head_sha']), 40)
+        self.assertEqual(data['commit_stats']['sampled_commits'], 2)
+        self.assertEqual(set(samples), {'README.md', 'src/app.py'})
+        self.assertIn('def handler_0', samples['src/app.py'])
@@ -5,6 +5,8 @@ from . import views
 router = DefaultRouter()
 router.register(r'repositories', views.RepositoryViewSet)
 router.register(r'analyses', views.AnalysisViewSet)
+router.register(r'analysis-batches', views.AnalysisBatchViewSet)
+router.register(r'personalities', views.PersonalityViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
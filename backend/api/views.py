@@ -1,29 +1,124 @@
 import uuid
+from collections import Counter
+from typing import List, Optional
+import requests
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from django.http import JsonResponse
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, Q
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from repositories.models import Repository
-from analyses.models import Analysis
+from analyses.models import Analysis, AnalysisBatch, AnalysisJob
 from personalities.models import Personality
 from .serializers import (
-    RepositorySerializer, AnalysisSerializer, 
+    RepositorySerializer, AnalysisSerializer, AnalysisBatchSerializer, AnalysisResultSerializer,
     PersonalitySerializer, PersonalityDetailSerializer
 )
-from .tasks import analyze_repository_task
+from .events import analysis_event_stream
+from .heuristics import TRAITS
+from .pagination import CreatedAtCursorPagination
+from .renderers import EventStreamRenderer
+from .resilience import get_circuit_breaker
+from .result_cache import cache_result, cached_result
+from .similarity import get_default_trait_index
+from .tasks import create_github_client, task_manager
+
+
+def is_truthy(value) -> bool:
+    return str(value if value is not None else '').lower() in ('1', 'true', 'yes')
+
+
+def parse_repository_url(repo_url) -> tuple:
+    """Validate a GitHub repository URL; returns (url, owner, name)"""
+    if not isinstance(repo_url, str) or 'github.com' not in repo_url:
+        raise ValueError('Only GitHub repositories are supported for MVP')
+
+    url = repo_url.strip().rstrip('/')
+    if url.endswith('.git'):
+        url = url[:-len('.git')]
+    parts = url.split('github.com', 1)[1].strip('/:').split('/')
+    if len(parts) != 2 or not all(parts):
+        raise ValueError('Expected https://github.com/<owner>/<repository>')
+    return url, parts[0], parts[1]
+
+
+# Analyses not scored by the heuristic fallback. A plain exclude() would also drop
+# rows without the key, since NOT (NULL = 'heuristic') is not true in SQL
+LLM_SCORED = Q(analysis_metadata__scored_by__isnull=True) | ~Q(analysis_metadata__scored_by='heuristic')
 
 
 class RepositoryViewSet(viewsets.ModelViewSet):
     queryset = Repository.objects.all()
     serializer_class = RepositorySerializer
     permission_classes = [AllowAny]
+    pagination_class = CreatedAtCursorPagination
+
+    def _find_reusable_analysis(self, repository: Repository):
+        """Return the latest completed analysis if the default-branch HEAD is unchanged"""
+        latest = (
+            Analysis.objects
+            .filter(repository=repository, status='completed', personality__isnull=False)
+            .exclude(head_sha__isnull=True)
+            .exclude(head_sha='')
+            .filter(LLM_SCORED)  # Fallback scores are worth redoing
+            .select_related('personality')
+            .order_by('-created_at')
+            .first()
+        )
+        if not latest:
+            return None
+
+        try:
+            head_sha = get_circuit_breaker("github").call(
+                create_github_client(interactive=True).get_head_sha, repository.repo_url
+            )
+        except Exception as e:
+            # Fall back to a fresh analysis if GitHub can't be reached
+            print(f"Warning: Could not check HEAD for {repository.repo_url}: {str(e)}")
+            return None
+
+        return latest if head_sha == latest.head_sha else None
+
+    def _start_analysis(self, repository: Repository,
+                        priority: int = AnalysisJob.PRIORITY_INTERACTIVE,
+                        payload: Optional[dict] = None):
+        """Queue an analysis, or attach to the one already in flight (single-flight)"""
+        analysis = Analysis.objects.filter(
+            repository=repository, status__in=Analysis.IN_FLIGHT_STATUSES
+        ).first()
+        if analysis is not None:
+            return analysis, True
+
+        try:
+            with transaction.atomic():
+                analysis = Analysis.objects.create(
+                    repository=repository,
+                    status='pending'
+                )
+                # Queue in the same transaction so a pending analysis always has a job
+                task_manager.enqueue_analysis(
+                    str(analysis.id), repository.repo_url, priority=priority, payload=payload
+                )
+        except IntegrityError:
+            # Another request (possibly on another process) won the race
+            analysis = Analysis.objects.filter(
+                repository=repository, status__in=Analysis.IN_FLIGHT_STATUSES
+            ).first()
+            if analysis is None:
+                raise
+            return analysis, True
+        return analysis, False
 
     @action(detail=False, methods=['post'])
     def analyze(self, request):
         """Start analysis of a repository"""
         repo_url = request.data.get('repo_url')
+        force = is_truthy(request.data.get('force', request.query_params.get('force')))
         
         if not repo_url:
             return Response(
@@ -31,37 +126,48 @@ class RepositoryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Validate GitHub URL
-        if 'github.com' not in repo_url:
-            return Response(
-                {'error': 'Only GitHub repositories are supported for MVP'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        # Validate GitHub URL; stored normalized so variants share one repository
+        try:
+            repo_url, owner, name = parse_repository_url(repo_url)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
             # Get or create repository
             repository, created = Repository.objects.get_or_create(
                 repo_url=repo_url,
                 defaults={
-                    'repo_name': repo_url.split('/')[-1].replace('.git', ''),
-                    'owner': repo_url.split('/')[-2],
+                    'repo_name': name,
+                    'owner': owner,
                     'platform': 'github'
                 }
             )
             
-            # Create analysis
-            analysis = Analysis.objects.create(
-                repository=repository,
-                status='pending'
-            )
-            
-            # Start async analysis task
-            analyze_repository_task(str(analysis.id), repo_url)
+            # Reuse the previous result if nothing was pushed since
+            if not force and not created:
+                previous = self._find_reusable_analysis(repository)
+                if previous:
+                    return Response({
+                        'analysis_id': str(previous.id),
+                        'status': 'completed',
+                        'cached': True,
+                        'head_sha': previous.head_sha,
+                        'message': 'Repository unchanged since last analysis',
+                        'repository': {
+                            'name': repository.repo_name,
+                            'owner': repository.owner,
+                            'url': repository.repo_url
+                        },
+                        'personality': PersonalityDetailSerializer(previous.personality).data
+                    }, status=status.HTTP_200_OK)
+
+            analysis, attached = self._start_analysis(repository)
             
             return Response({
                 'analysis_id': str(analysis.id),
-                'status': 'pending',
-                'message': 'Repository analysis started',
+                'status': analysis.status,
+                'attached': attached,
+                'message': 'Attached to in-progress analysis' if attached else 'Repository analysis started',
                 'repository': {
                     'name': repository.repo_name,
                     'owner': repository.owner,
@@ -77,41 +183,341 @@ class RepositoryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _enqueue_batch(self, batch: AnalysisBatch, repositories: List[Repository],
+                       payloads: Optional[dict] = None):
+        """
+        Queue analyses of many repositories under a batch with bulk inserts;
+        repositories with an analysis in flight are attached to it instead.
+        Must run inside a transaction. Returns (started, attached) analyses.
+        """
+        payloads = payloads or {}
+        attached = list(Analysis.objects.filter(
+            repository__in=repositories, status__in=Analysis.IN_FLIGHT_STATUSES
+        ))
+        busy = {analysis.repository_id for analysis in attached}
+        idle = [repository for repository in repositories if repository.id not in busy]
+
+        started = [Analysis(repository=repository, status='pending') for repository in idle]
+        try:
+            with transaction.atomic():
+                Analysis.objects.bulk_create(started)
+                task_manager.enqueue_analyses(started, priority=AnalysisJob.PRIORITY_BULK, payloads=payloads)
+        except IntegrityError:
+            # Raced with other analyze requests; fall back to one at a time
+            started = []
+            for repository in idle:
+                analysis, was_attached = self._start_analysis(
+                    repository, priority=AnalysisJob.PRIORITY_BULK, payload=payloads.get(repository.id)
+                )
+                (attached if was_attached else started).append(analysis)
+
+        batch.analyses.add(*started, *attached)
+        return started, attached
+
+    @action(detail=False, methods=['post'], url_path='analyze-bulk')
+    def analyze_bulk(self, request):
+        """Start analyses of many repositories under one batch"""
+        repo_urls = request.data.get('repo_urls')
+        if not isinstance(repo_urls, list) or not repo_urls:
+            return Response(
+                {'error': 'repo_urls must be a non-empty list of repository URLs'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(repo_urls) > settings.BULK_ANALYZE_MAX_REPOSITORIES:
+            return Response(
+                {'error': f'At most {settings.BULK_ANALYZE_MAX_REPOSITORIES} repositories per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Validate and de-duplicate
+        valid, invalid = {}, []
+        for repo_url in repo_urls:
+            try:
+                normalized, owner, name = parse_repository_url(repo_url)
+            except ValueError as e:
+                invalid.append({'repo_url': repo_url, 'error': str(e)})
+                continue
+            valid.setdefault(normalized, (owner, name))
+        if not valid:
+            return Response(
+                {'error': 'No valid repository URLs', 'invalid': invalid},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            with transaction.atomic():
+                # Upsert repositories with one insert and one select
+                Repository.objects.bulk_create(
+                    [
+                        Repository(repo_url=url, repo_name=name, owner=owner, platform='github')
+                        for url, (owner, name) in valid.items()
+                    ],
+                    ignore_conflicts=True
+                )
+                repositories = list(Repository.objects.filter(repo_url__in=valid.keys()))
+
+                batch = AnalysisBatch.objects.create(requested_count=len(repo_urls), invalid_urls=invalid)
+                started, attached = self._enqueue_batch(batch, repositories)
+
+            return Response({
+                'batch_id': str(batch.id),
+                'queued': len(started),
+                'attached': len(attached),
+                'invalid': invalid,
+                'message': f'{len(started) + len(attached)} repository analyses started'
+            }, status=status.HTTP_202_ACCEPTED)
+
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return Response(
+                {'error': f'Failed to start bulk analysis: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['post'], url_path='analyze-owner')
+    def analyze_owner(self, request):
+        """Analyze every repository of a GitHub organization or user"""
+        owner = str(request.data.get('owner') or '').strip()
+        if not owner or '/' in owner:
+            return Response(
+                {'error': 'owner must be a GitHub organization or user name'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filters = {
+            'include_forks': is_truthy(request.data.get('include_forks')),
+            'include_archived': is_truthy(request.data.get('include_archived')),
+            'max_size_kb': request.data.get('max_size_kb'),
+            'pushed_since': request.data.get('pushed_since'),
+        }
+        force = is_truthy(request.data.get('force'))
+        try:
+            max_size_kb = int(filters['max_size_kb']) if filters['max_size_kb'] not in (None, '') else None
+            pushed_since = parse_datetime(filters['pushed_since']) if filters['pushed_since'] else None
+            if filters['pushed_since'] and pushed_since is None:
+                raise ValueError('pushed_since must be an ISO 8601 timestamp')
+        except (TypeError, ValueError) as e:
+            return Response({'error': f'Invalid filter: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One paginated listing returns the metadata every analysis needs
+        listing, filtered = [], 0
+        try:
+            for repo in get_circuit_breaker("github").call(
+                lambda: list(create_github_client(interactive=True).iter_owner_repositories(owner))
+            ):
+                pushed_at = parse_datetime(repo['pushed_at']) if repo.get('pushed_at') else None
+                if (repo.get('fork') and not filters['include_forks']) \
+                        or (repo.get('archived') and not filters['include_archived']) \
+                        or (max_size_kb is not None and repo.get('size', 0) > max_size_kb) \
+                        or (pushed_since and (pushed_at is None or pushed_at < pushed_since)):
+                    filtered += 1
+                    continue
+                listing.append(repo)
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return Response({'error': f'GitHub owner not found: {owner}'}, status=status.HTTP_404_NOT_FOUND)
+            return Response({'error': f'Failed to list repositories: {str(e)}'}, status=status.HTTP_502_BAD_GATEWAY)
+        except Exception as e:
+            return Response({'error': f'Failed to list repositories: {str(e)}'}, status=status.HTTP_502_BAD_GATEWAY)
+
+        if len(listing) > settings.SWEEP_MAX_REPOSITORIES:
+            return Response(
+                {'error': f'{owner} has {len(listing)} matching repositories, '
+                          f'at most {settings.SWEEP_MAX_REPOSITORIES} can be swept at once; narrow the filters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            with transaction.atomic():
+                # Upsert with the listing's metadata
+                Repository.objects.bulk_create(
+                    [
+                        Repository(
+                            repo_url=repo['html_url'],
+                            repo_name=repo['name'],
+                            owner=repo['owner']['login'],
+                            platform='github',
+                            description=repo.get('description'),
+                            stars_count=repo.get('stargazers_count', 0),
+                            forks_count=repo.get('forks_count', 0),
+                            language=repo.get('language')
+                        )
+                        for repo in listing
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['repo_url'],
+                    update_fields=['description', 'stars_count', 'forks_count', 'language']
+                )
+                by_url = {repo['html_url']: repo for repo in listing}
+                repositories = list(Repository.objects.filter(repo_url__in=by_url.keys()))
+
+                # Incremental: nothing pushed since the last completed analysis means the HEAD is unchanged
+                latest = {}
+                if not force:
+                    completed = (
+                        Analysis.objects
+                        .filter(repository__in=repositories, status='completed', personality__isnull=False)
+                        .filter(LLM_SCORED)
+                        .only('id', 'repository_id', 'created_at')
+                        .order_by('-created_at')
+                    )
+                    for analysis in completed:
+                        latest.setdefault(analysis.repository_id, analysis)
+
+                unchanged, changed = [], []
+                for repository in repositories:
+                    previous = latest.get(repository.id)
+                    pushed_at = by_url[repository.repo_url].get('pushed_at')
+                    if previous and pushed_at and parse_datetime(pushed_at) <= previous.created_at:
+                        unchanged.append(previous)
+                    else:
+                        changed.append(repository)
+
+                batch = AnalysisBatch.objects.create(
+                    owner=owner,
+                    filters=filters,
+                    requested_count=len(listing)
+                )
+                # Unchanged repositories count towards the rollup with their existing result
+                batch.analyses.add(*unchanged)
+                started, attached = self._enqueue_batch(
+                    batch,
+                    changed,
+                    payloads={
+                        repository.id: {'repository': by_url[repository.repo_url]}
+                        for repository in changed
+                    }
+                )
+
+            return Response({
+                'batch_id': str(batch.id),
+                'owner': owner,
+                'listed': len(listing) + filtered,
+                'filtered': filtered,
+                'unchanged': len(unchanged),
+                'queued': len(started),
+                'attached': len(attached),
+                'message': f'{len(started) + len(attached)} of {len(listing)} repositories need analysis'
+            }, status=status.HTTP_202_ACCEPTED)
+
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return Response(
+                {'error': f'Failed to start sweep: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class AnalysisBatchViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = AnalysisBatch.objects.all()
+    serializer_class = AnalysisBatchSerializer
+    permission_classes = [AllowAny]
+    lookup_field = 'id'
+
+    @action(detail=True, methods=['get'])
+    def rollup(self, request, id=None):
+        """Trait scores aggregated over the completed analyses of a batch (e.g. an organization)"""
+        batch = self.get_object()
+        personalities = Personality.objects.filter(analysis__batches=batch, analysis__status='completed')
+
+        aggregates = personalities.aggregate(
+            count=Count('id'),
+            **{trait: Avg(f'{trait}_score') for trait in TRAITS}
+        )
+        tags = Counter(tag for tag_list in personalities.values_list('tags', flat=True) for tag in tag_list or [])
+        shapes = {
+            row['shape_type']: row['count']
+            for row in personalities.values('shape_type').annotate(count=Count('id'))
+        }
+        pending = batch.analyses.filter(status__in=Analysis.IN_FLIGHT_STATUSES).count()
+
+        return Response({
+            'batch_id': str(batch.id),
+            'owner': batch.owner,
+            'analyzed': aggregates.pop('count'),
+            'pending': pending,
+            'traits': {
+                trait: round(float(value), 2) if value is not None else None
+                for trait, value in aggregates.items()
+            },
+            'top_tags': [{'tag': tag, 'count': count} for tag, count in tags.most_common(10)],
+            'shapes': shapes
+        })
+
 
 class AnalysisViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Analysis.objects.all()
     serializer_class = AnalysisSerializer
     permission_classes = [AllowAny]
     lookup_field = 'id'
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        return queryset.select_related('repository')
+        queryset = super().get_queryset().select_related('repository')
+        if self.action == 'result':
+            # Two queries in total: the analysis joined with repository and personality, then insights
+            queryset = queryset.select_related('personality').prefetch_related('personality__insights')
+        return queryset
 
     def retrieve(self, request, *args, **kwargs):
-        """Get analysis details with progress calculation"""
+        """Get analysis details with progress calculation (prefer /events for live updates)"""
         instance = self.get_object()
         serializer = self.get_serializer(instance)
         
-        # Calculate progress percentage
-        progress = 0
-        if instance.status == 'completed':
-            progress = 100
-        elif instance.status == 'failed':
-            progress = 0
-        elif instance.status == 'processing':
-            progress = 50  # Midway through analysis
-        elif instance.status == 'pending':
-            progress = 10  # Just started
-        
+        # Progress follows the pipeline stage
         response_data = serializer.data
-        response_data['progress'] = progress
+        response_data['progress'] = instance.progress
         
         return Response(response_data)
 
+    @action(detail=True, methods=['get'])
+    def result(self, request, id=None):
+        """Analysis, progress, personality and insights in a single response"""
+        cached = cached_result(request, 'result', id)
+        if cached is not None:
+            return cached
+
+        analysis = self.get_object()
+        serializer = AnalysisResultSerializer(analysis)
+        if analysis.status == 'completed':
+            return cache_result(request, 'result', id, serializer.data)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'], renderer_classes=[EventStreamRenderer])
+    def events(self, request, id=None):
+        """Server-sent events: stage transitions, then the final result"""
+        analysis = self.get_object()
+
+        def render_result(finished: Analysis) -> dict:
+            personality = Personality.objects.filter(analysis=finished).first()
+            return {
+                'analysis_id': str(finished.id),
+                'status': finished.status,
+                'progress': finished.progress,
+                'personality': PersonalityDetailSerializer(personality).data if personality else None
+            }
+
+        response = StreamingHttpResponse(
+            analysis_event_stream(
+                str(analysis.id),
+                render_result,
+                max_seconds=settings.ANALYSIS_EVENTS_MAX_SECONDS
+            ),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+        return response
+
     @action(detail=True, methods=['get'])
     def personality(self, request, id=None):
         """Get personality data for this analysis"""
+        cached = cached_result(request, 'personality', id)
+        if cached is not None:
+            return cached
+
         try:
             analysis = self.get_object()
             personality = Personality.objects.filter(analysis=analysis).first()
@@ -123,6 +529,8 @@ class AnalysisViewSet(viewsets.ReadOnlyModelViewSet):
                 )
             
             serializer = PersonalityDetailSerializer(personality)
+            if analysis.status == 'completed':
+                return cache_result(request, 'personality', id, serializer.data)
             return Response(serializer.data)
             
         except Exception as e:
@@ -131,4 +539,74 @@ class AnalysisViewSet(viewsets.ReadOnlyModelViewSet):
             return Response(
                 {'error': f'Failed to get personality: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+
+class PersonalityViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Personality.objects.select_related('analysis__repository')
+    serializer_class = PersonalitySerializer
+    permission_classes = [AllowAny]
+    lookup_field = 'id'
+    pagination_class = CreatedAtCursorPagination
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, id=None):
+        """Repositories whose personality trait vectors are closest to this one"""
+        personality = self.get_object()
+        metric = request.query_params.get('metric', 'cosine')
+        try:
+            k = int(request.query_params.get('k', 10))
+        except (TypeError, ValueError):
+            k = None
+        if k is None or not 1 <= k <= 50:
+            return Response({'error': 'k must be an integer between 1 and 50'}, status=status.HTTP_400_BAD_REQUEST)
+
+        vector = [getattr(personality, f'{trait}_score') for trait in TRAITS]
+        if any(score is None for score in vector):
+            return Response({'error': 'this personality has no trait scores yet'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Personalities deleted since the index loaded them are skipped, so
+        # over-fetch until k live ones are found or the index runs out
+        fetch = k
+        while True:
+            try:
+                neighbours = get_default_trait_index().query(
+                    [float(score) for score in vector],
+                    k=fetch,
+                    metric=metric,
+                    exclude_repository=str(personality.analysis.repository_id)
+                )
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            matches = Personality.objects.select_related('analysis__repository').in_bulk(
+                [personality_id for personality_id, _ in neighbours]
+            )
+            live = [(matches[uuid.UUID(personality_id)], score) for personality_id, score in neighbours
+                    if uuid.UUID(personality_id) in matches]
+            if len(live) >= k or len(neighbours) < fetch:
+                break
+            fetch *= 2
+
+        results = []
+        for match, score in live[:k]:
+            repository = match.analysis.repository
+            results.append({
+                'personality_id': str(match.id),
+                'analysis_id': str(match.analysis_id),
+                'repository': {
+                    'id': str(repository.id),
+                    'owner': repository.owner,
+                    'repo_name': repository.repo_name,
+                    'repo_url': repository.repo_url
+                },
+                'score': score,
+                'traits': {trait: float(getattr(match, f'{trait}_score')) for trait in TRAITS},
+                'primary_color': match.primary_color,
+                'shape_type': match.shape_type
+            })
+
+        return Response({
+            'personality_id': str(personality.id),
+            'metric': metric,
+            'results': results
+        })
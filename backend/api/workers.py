@@ -0,0 +1,107 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, List
+from django.db import connection
+from .tasks import task_manager
+
+
+class AnalysisWorkerPool:
+    """
+    Pool of worker threads that lease analysis jobs from the database.
+
+    Several pools (on the same or on different nodes) can share one job table:
+    leasing uses SKIP LOCKED so each job is handed to exactly one worker.
+    """
+
+    def __init__(self, worker_count: int, lease_seconds: int, poll_interval: float):
+        self.worker_count = worker_count
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stop_event = threading.Event()
+        self.abandon_event = threading.Event()  # Drain timed out: stop extending leases
+        self.threads: List[threading.Thread] = []
+        self.running_jobs: Dict[str, str] = {}  # worker_id -> job_id
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start worker threads and the lease heartbeat"""
+        for index in range(self.worker_count):
+            worker_id = f"{self.node_id}/{index}"
+            # Daemon threads, so a drain that times out doesn't keep the process alive
+            thread = threading.Thread(
+                target=self._work_loop, args=(worker_id,), name=f"analysis-worker-{index}", daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="analysis-worker-heartbeat", daemon=True)
+        heartbeat.start()
+
+    def drain(self, timeout: float = None) -> bool:
+        """
+        Stop leasing new jobs and wait for in-flight jobs to finish.
+
+        Returns False if some jobs were still running when the timeout expired.
+        Their leases are no longer extended, so once the process exits they
+        lapse and another worker picks the jobs up.
+        """
+        self.stop_event.set()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for thread in self.threads:
+            thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        if any(thread.is_alive() for thread in self.threads):
+            self.abandon_event.set()
+            return False
+        return True
+
+    def in_flight(self) -> int:
+        with self.lock:
+            return len(self.running_jobs)
+
+    def _work_loop(self, worker_id: str):
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    job = task_manager.lease_next_job(worker_id, self.lease_seconds)
+                except Exception as e:
+                    print(f"Worker {worker_id} could not lease a job: {str(e)}")
+                    connection.close()
+                    job = None
+
+                if job is None:
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+
+                with self.lock:
+                    self.running_jobs[worker_id] = str(job.id)
+                try:
+                    task_manager.run_job(job, worker_id)
+                except Exception as e:
+                    # Bookkeeping queries failed (e.g. the database restarted); the
+                    # lease lapses and the job is retried, this worker keeps going
+                    print(f"Worker {worker_id} failed to run job {job.id}: {str(e)}")
+                    connection.close()
+                finally:
+                    with self.lock:
+                        self.running_jobs.pop(worker_id, None)
+        finally:
+            connection.close()
+
+    def _heartbeat_loop(self):
+        interval = max(self.lease_seconds / 3, 1)
+        while True:
+            time.sleep(interval)
+            if self.abandon_event.is_set() or (self.stop_event.is_set() and not self.in_flight()):
+                break
+            with self.lock:
+                leases = list(self.running_jobs.items())
+            for worker_id, job_id in leases:
+                try:
+                    task_manager.extend_leases([job_id], worker_id, self.lease_seconds)
+                except Exception as e:
+                    print(f"Failed to extend lease for job {job_id}: {str(e)}")
+        connection.close()
@@ -1,31 +1,14 @@
 import requests
 import json
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 import time
+from .json_stream import IncrementalObjectParser
+from .llm_cache import LLMResponseCache
+from .llm_gateway import LLMGateway
 
 
 class ZAIClient:
-    def __init__(self, zai_api_key: str):
-        self.api_url = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
-        self.headers = {
-            "Authorization": f"Bearer {zai_api_key}",
-            "Content-Type": "application/json"
-        }
-
-    def analyze_repository_with_zai(self, repository_data: Dict[str, Any], sample_files: Dict[str, str]) -> Dict[str, Any]:
-        """
-        Analyze repository using Z AI API and extract personality traits
-        
-        Args:
-            repository_data: Repository metadata from GitHub API
-            sample_files: Sample file contents for analysis
-            
-        Returns:
-            Dict containing personality traits, visualization data, and insights
-        """
-        try:
-            # Create the prompt for Z AI
-            system_prompt = """You analyze Git repositories and extract personality traits based on code structure, patterns, and quality. 
+    SYSTEM_PROMPT = """You analyze Git repositories and extract personality traits based on code structure, patterns, and quality. 
             Provide analysis in JSON format with the following structure:
             {
                 "traits": {
@@ -69,26 +52,61 @@ class ZAIClient:
             - Performance: 0-1 (higher for optimized code, good algorithms)
             """
 
+    # Appended to SYSTEM_PROMPT for multi-repository requests
+    BATCH_INSTRUCTIONS = """
+            You will be given several repositories, each introduced by an id in square brackets.
+            Respond with one JSON object of the form {"results": {"<id>": <analysis>, ...}}
+            where every <analysis> follows the structure above. Include every id exactly once.
+            """
+    BATCH_TOKENS_PER_REPOSITORY = 700
+
+    def __init__(self, zai_api_key: str, gateway: Optional[LLMGateway] = None,
+                 cache: Optional[LLMResponseCache] = None):
+        self.api_url = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
+        self.headers = {
+            "Authorization": f"Bearer {zai_api_key}",
+            "Content-Type": "application/json"
+        }
+        # Pooled connections plus concurrency / token-per-minute limits
+        self.gateway = gateway or LLMGateway()
+        self.cache = cache
+        self.last_cache_hit = False
+
+    def estimate_tokens(self, payload: Dict[str, Any]) -> int:
+        """Rough upper bound of tokens a request consumes (prompt + completion)"""
+        prompt_chars = sum(len(message["content"]) for message in payload["messages"])
+        return prompt_chars // 3 + payload.get("max_tokens", 0)
+
+    def analyze_repository_with_zai(self, repository_data: Dict[str, Any], sample_files: Dict[str, str],
+                                    on_section: Optional[Callable[[str, Any], None]] = None,
+                                    stream: bool = False) -> Dict[str, Any]:
+        """
+        Analyze repository using Z AI API and extract personality traits
+        
+        Args:
+            repository_data: Repository metadata from GitHub API
+            sample_files: Sample file contents for analysis
+            on_section: Called with (key, value) for each top-level section of the
+                result ("traits", "visualization", ...) as soon as it is complete
+            stream: Request a streamed completion so sections arrive while the
+                rest is still being generated
+            
+        Returns:
+            Dict containing personality traits, visualization data, and insights
+        """
+        try:
             # Format repository data for the prompt
-            repo_info = repository_data.get("repository", {})
             user_prompt = f"""
             Analyze this repository:
 
-            Repository: {repo_info.get('full_name', 'Unknown')}
-            Description: {repo_info.get('description', 'No description')}
-            Language: {repo_info.get('language', 'Unknown')}
-            Stars: {repo_info.get('stargazers_count', 0)}
-            Forks: {repo_info.get('forks_count', 0)}
-            File Count: {repository_data.get('file_count', 0)}
-            Commit Count: {repository_data.get('commit_count', 0)}
-            Top Languages: {repository_data.get('top_languages', {})}
+            {self.format_summary(repository_data, indent=" " * 12)}
 
             Sample Files:
             """
             
             # Add sample file contents
             for file_path, content in sample_files.items():
-                user_prompt += f"\n\n--- {file_path} ---\n{content[:1000]}..."  # Truncate for context
+                user_prompt += f"\n\n--- {file_path} ---\n{content}"  # Already packed into the prompt budget
             
             user_prompt += "\n\nProvide a comprehensive personality analysis of this codebase."
 
@@ -98,7 +116,7 @@ class ZAIClient:
                 "messages": [
                     {
                         "role": "system",
-                        "content": system_prompt
+                        "content": self.SYSTEM_PROMPT
                     },
                     {
                         "role": "user",
@@ -110,21 +128,36 @@ class ZAIClient:
                 "max_tokens": 2000
             }
 
-            response = requests.post(
-                self.api_url,
-                headers=self.headers,
-                json=payload,
-                timeout=60  # 60 second timeout
-            )
-            
-            response.raise_for_status()
-            response_data = response.json()
-            
-            # Extract the content
-            if "choices" not in response_data or not response_data["choices"]:
-                raise ValueError("Invalid response from Z AI API: No choices found")
-            
-            content = response_data["choices"][0].get("message", {}).get("content", "")
+            # Identical requests (e.g. re-analysis of an unchanged repository) skip the network
+            self.last_cache_hit = False
+            if self.cache is not None:
+                cached_content = self.cache.get(payload)
+                if cached_content is not None:
+                    self.last_cache_hit = True
+                    result = json.loads(cached_content)
+                    for key, value in result.items():
+                        self._emit_section(on_section, key, value)
+                    return result
+
+            if stream:
+                content = self._stream_completion(payload, on_section)
+            else:
+                response = self.gateway.post(
+                    self.api_url,
+                    estimated_tokens=self.estimate_tokens(payload),
+                    headers=self.headers,
+                    json=payload,
+                    timeout=60  # 60 second timeout
+                )
+                
+                response.raise_for_status()
+                response_data = response.json()
+                
+                # Extract the content
+                if "choices" not in response_data or not response_data["choices"]:
+                    raise ValueError("Invalid response from Z AI API: No choices found")
+                
+                content = response_data["choices"][0].get("message", {}).get("content", "")
             
             if not content:
                 raise ValueError("Empty response from Z AI API")
@@ -132,9 +165,13 @@ class ZAIClient:
             # Parse JSON response
             try:
                 result = json.loads(content)
-                return result
             except json.JSONDecodeError as e:
                 raise ValueError(f"Failed to parse Z AI response as JSON: {str(e)}. Content: {content[:500]}...")
+
+            # Only cache well-formed analyses, so a bad completion is retried next time
+            if self.cache is not None and self.validate_response(result):
+                self.cache.set(payload, content)
+            return result
                 
         except requests.exceptions.Timeout:
             raise ValueError("Z AI API request timed out")
@@ -148,18 +185,154 @@ class ZAIClient:
         except Exception as e:
             raise ValueError(f"Failed to analyze repository with Z AI: {str(e)}")
 
-    def validate_response(self, response_data: Dict[str, Any]) -> bool:
-        """Validate that the Z AI response has the expected structure"""
-        required_fields = ["traits", "visualization", "description", "tags", "insights"]
+    def format_summary(self, repository_data: Dict[str, Any], indent: str = "") -> str:
+        """Compact text summary of a repository (metadata only, no file contents)"""
+        repo_info = repository_data.get("repository", {})
+        commit_stats = repository_data.get("commit_stats", {})
+        return f"\n{indent}".join([
+            f"Repository: {repo_info.get('full_name', 'Unknown')}",
+            f"Description: {repo_info.get('description', 'No description')}",
+            f"Language: {repo_info.get('language', 'Unknown')}",
+            f"Stars: {repo_info.get('stargazers_count', 0)}",
+            f"Forks: {repo_info.get('forks_count', 0)}",
+            f"File Count: {repository_data.get('file_count', 0)}",
+            f"Commit Count: {repository_data.get('commit_count', 0)}",
+            f"Recent Contributors: {commit_stats.get('unique_authors', 'Unknown')}",
+            f"Commits Per Week: {commit_stats.get('commits_per_week', 'Unknown')}",
+            f"Top Languages: {repository_data.get('top_languages', {})}",
+        ])
+
+    def analyze_repositories_batch(self, summaries: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyze several repositories with a single completion
         
-        if not all(field in response_data for field in required_fields):
-            return False
+        The schema and scoring guidelines are sent once for the whole batch
+        instead of once per repository.
         
-        # Validate traits
-        traits = response_data.get("traits", {})
+        Args:
+            summaries: Repository data (shaped like fetch_repository output, no
+                sample files) keyed by short ids chosen by the caller
+            
+        Returns:
+            Valid analyses keyed by the same ids. Repositories the model left
+            out or answered with a malformed analysis are missing.
+        """
+        if not summaries:
+            return {}
+        
+        try:
+            user_prompt = "Analyze each of these repositories:"
+            for key, repository_data in summaries.items():
+                user_prompt += f"\n\n[{key}]\n{self.format_summary(repository_data)}"
+            
+            payload = {
+                "model": "glm-4-plus",
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": self.SYSTEM_PROMPT + self.BATCH_INSTRUCTIONS
+                    },
+                    {
+                        "role": "user",
+                        "content": user_prompt
+                    }
+                ],
+                "response_format": {"type": "json_object"},
+                "temperature": 0.3,
+                "max_tokens": self.BATCH_TOKENS_PER_REPOSITORY * len(summaries)
+            }
+            
+            response = self.gateway.post(
+                self.api_url,
+                estimated_tokens=self.estimate_tokens(payload),
+                headers=self.headers,
+                json=payload,
+                timeout=300  # Long completions for large batches
+            )
+            response.raise_for_status()
+            response_data = response.json()
+            
+            if "choices" not in response_data or not response_data["choices"]:
+                raise ValueError("Invalid response from Z AI API: No choices found")
+            content = response_data["choices"][0].get("message", {}).get("content", "")
+            
+            try:
+                results = json.loads(content).get("results", {})
+            except (json.JSONDecodeError, AttributeError) as e:
+                raise ValueError(f"Failed to parse Z AI batch response as JSON: {str(e)}. Content: {content[:500]}...")
+            
+            return {
+                key: result for key, result in results.items()
+                if key in summaries and isinstance(result, dict) and self.validate_response(result)
+            }
+            
+        except requests.exceptions.Timeout:
+            raise ValueError("Z AI API batch request timed out")
+        except requests.exceptions.RequestException as e:
+            if e.response:
+                raise ValueError(f"Z AI API error ({e.response.status_code}): {e.response.text}")
+            raise ValueError(f"Network error calling Z AI API: {str(e)}")
+
+    def _stream_completion(self, payload: Dict[str, Any], on_section: Optional[Callable[[str, Any], None]]) -> str:
+        """Read a server-sent-events completion, emitting sections as they complete"""
+        parser = IncrementalObjectParser()
+        parsing = True
+        parts = []
+
+        with self.gateway.stream(
+            self.api_url,
+            estimated_tokens=self.estimate_tokens(payload),
+            headers=self.headers,
+            json=dict(payload, stream=True),
+            timeout=60  # Max seconds between chunks
+        ) as response:
+            response.raise_for_status()
+            response.encoding = response.encoding or "utf-8"
+
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                chunk = json.loads(data)
+                usage = chunk.get("usage") or {}
+                if usage.get("total_tokens") is not None:
+                    # Sent with the last chunk; settles the gateway's token estimate
+                    response.total_tokens = usage["total_tokens"]
+                choices = chunk.get("choices") or []
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if not delta:
+                    continue
+                parts.append(delta)
+
+                if parsing:
+                    try:
+                        members = parser.feed(delta)
+                    except json.JSONDecodeError:
+                        # Leave it to the full parse to report the problem
+                        parsing = False
+                        continue
+                    for key, value in members:
+                        self._emit_section(on_section, key, value)
+
+        return "".join(parts)
+
+    def _emit_section(self, on_section: Optional[Callable[[str, Any], None]], key: str, value: Any):
+        if on_section is None:
+            return
+        try:
+            on_section(key, value)
+        except Exception as e:
+            # A failed early write must not abort the completion itself
+            print(f"Warning: Could not handle streamed section '{key}': {str(e)}")
+
+    def validate_traits(self, traits: Dict[str, Any]) -> bool:
+        """Check that all six traits are present and between 0 and 1"""
         required_traits = ["complexity", "creativity", "maintainability", "innovation", "organization", "performance"]
         
-        if not all(trait in traits for trait in required_traits):
+        if not isinstance(traits, dict) or not all(trait in traits for trait in required_traits):
             return False
         
         # Validate trait values are between 0 and 1
@@ -167,6 +340,19 @@ class ZAIClient:
             if not isinstance(trait_value, (int, float)) or trait_value < 0 or trait_value > 1:
                 return False
         
+        return True
+
+    def validate_response(self, response_data: Dict[str, Any]) -> bool:
+        """Validate that the Z AI response has the expected structure"""
+        required_fields = ["traits", "visualization", "description", "tags", "insights"]
+        
+        if not all(field in response_data for field in required_fields):
+            return False
+        
+        # Validate traits
+        if not self.validate_traits(response_data.get("traits", {})):
+            return False
+        
         # Validate visualization
         visualization = response_data.get("visualization", {})
         if "colors" not in visualization or "shape" not in visualization:
@@ -166,6 +166,121 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 }
 
+# Analysis job queue
+ANALYSIS_WORKER_COUNT = config('ANALYSIS_WORKER_COUNT', default=2, cast=int)
+ANALYSIS_JOB_LEASE_SECONDS = config('ANALYSIS_JOB_LEASE_SECONDS', default=300, cast=int)
+ANALYSIS_JOB_MAX_ATTEMPTS = config('ANALYSIS_JOB_MAX_ATTEMPTS', default=3, cast=int)
+ANALYSIS_WORKER_POLL_INTERVAL = config('ANALYSIS_WORKER_POLL_INTERVAL', default=2.0, cast=float)
+ANALYSIS_WORKER_DRAIN_TIMEOUT = config('ANALYSIS_WORKER_DRAIN_TIMEOUT', default=120.0, cast=float)
+
+# GitHub API tokens. Requests are spread over all of them by remaining rate-limit
+# budget; when every token is exhausted workers wait up to the max wait for a reset
+# (calls made inside API requests never wait, they fall back instead)
+GITHUB_TOKENS = [
+    token.strip()
+    for token in config('GITHUB_TOKENS', default=config('GITHUB_TOKEN', default='')).split(',')
+    if token.strip()
+]
+GITHUB_RATE_LIMIT_MAX_WAIT_SECONDS = config('GITHUB_RATE_LIMIT_MAX_WAIT_SECONDS', default=900.0, cast=float)
+
+# Local caches (shared by processes on the same node)
+CACHE_ROOT = config('GITSOUL_CACHE_DIR', default=str(BASE_DIR / 'cache'))
+
+# Rendered results of completed analyses (never change once completed), served
+# with strong ETags. Any Django cache backend works; locmem suits tests
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'results': {
+        'BACKEND': config('RESULT_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('RESULT_CACHE_LOCATION', default=os.path.join(CACHE_ROOT, 'results')),
+        'TIMEOUT': config('RESULT_CACHE_TTL_SECONDS', default=30 * 24 * 3600, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('RESULT_CACHE_MAX_ENTRIES', default=50000, cast=int),
+        },
+    },
+}
+RESULT_CACHE_ALIAS = 'results'
+
+# GitHub conditional-request (ETag) cache
+GITHUB_HTTP_CACHE_ENABLED = config('GITHUB_HTTP_CACHE_ENABLED', default=True, cast=bool)
+GITHUB_HTTP_CACHE_DIR = config('GITHUB_HTTP_CACHE_DIR', default=os.path.join(CACHE_ROOT, 'github'))
+GITHUB_HTTP_CACHE_MAX_BYTES = config('GITHUB_HTTP_CACHE_MAX_BYTES', default=256 * 1024 * 1024, cast=int)
+
+# Optional bare-mirror backend: trees, blobs and history are read from local
+# `git clone --mirror` copies that are incrementally fetched on re-analysis
+GITHUB_MIRROR_ENABLED = config('GITHUB_MIRROR_ENABLED', default=False, cast=bool)
+GITHUB_MIRROR_DIR = config('GITHUB_MIRROR_DIR', default=os.path.join(CACHE_ROOT, 'mirrors'))
+GITHUB_MIRROR_MAX_BYTES = config('GITHUB_MIRROR_MAX_BYTES', default=5 * 1024 * 1024 * 1024, cast=int)
+GITHUB_MIRROR_TIMEOUT_SECONDS = config('GITHUB_MIRROR_TIMEOUT_SECONDS', default=300.0, cast=float)
+
+# Number of recent commits streamed for authorship / cadence statistics
+GITHUB_COMMIT_HISTORY_LIMIT = config('GITHUB_COMMIT_HISTORY_LIMIT', default=100, cast=int)
+
+# Sample file download. "contents" makes one API call per file; "tarball"
+# streams the repository archive once, so GITHUB_SAMPLE_MAX_FILES can be raised
+GITHUB_INGESTION_MODE = config('GITHUB_INGESTION_MODE', default='contents')
+GITHUB_SAMPLE_MAX_FILES = config('GITHUB_SAMPLE_MAX_FILES', default=8, cast=int)
+GITHUB_SAMPLE_CONCURRENCY = config('GITHUB_SAMPLE_CONCURRENCY', default=4, cast=int)
+GITHUB_SAMPLE_DEADLINE_SECONDS = config('GITHUB_SAMPLE_DEADLINE_SECONDS', default=20.0, cast=float)
+
+# Estimated tokens of sample code in the analysis prompt, and the most any one
+# file may take. Highest ranked files are packed first.
+ANALYSIS_PROMPT_TOKEN_BUDGET = config('ANALYSIS_PROMPT_TOKEN_BUDGET', default=6000, cast=int)
+ANALYSIS_SAMPLE_MAX_FILE_TOKENS = config('ANALYSIS_SAMPLE_MAX_FILE_TOKENS', default=1500, cast=int)
+
+# Z AI gateway: max concurrent completions and a tokens-per-minute budget
+# (0 = unlimited) for the whole deployment; callers over budget queue instead of
+# hitting 429s. Shared by all processes through PostgreSQL (per process on SQLite)
+ZAI_MAX_CONCURRENCY = config('ZAI_MAX_CONCURRENCY', default=4, cast=int)
+ZAI_TOKENS_PER_MINUTE = config('ZAI_TOKENS_PER_MINUTE', default=0, cast=int)
+
+# Per-stage retries of transient GitHub / Z AI errors (timeouts, 5xx, 429):
+# exponential backoff with full jitter
+RETRY_MAX_ATTEMPTS = config('RETRY_MAX_ATTEMPTS', default=3, cast=int)
+RETRY_BASE_DELAY_SECONDS = config('RETRY_BASE_DELAY_SECONDS', default=1.0, cast=float)
+RETRY_MAX_DELAY_SECONDS = config('RETRY_MAX_DELAY_SECONDS', default=20.0, cast=float)
+
+# After this many consecutive transient failures a provider's calls fail fast
+# (Z AI then falls back to heuristic scores) until a trial call succeeds
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = config('CIRCUIT_BREAKER_FAILURE_THRESHOLD', default=5, cast=int)
+CIRCUIT_BREAKER_RESET_SECONDS = config('CIRCUIT_BREAKER_RESET_SECONDS', default=60.0, cast=float)
+
+# Send a duplicate Z AI request when one is slower than this percentile of
+# recent calls (not combined with streaming)
+ZAI_HEDGE_ENABLED = config('ZAI_HEDGE_ENABLED', default=False, cast=bool)
+ZAI_HEDGE_PERCENTILE = config('ZAI_HEDGE_PERCENTILE', default=95.0, cast=float)
+ZAI_HEDGE_MIN_SAMPLES = config('ZAI_HEDGE_MIN_SAMPLES', default=20, cast=int)
+
+# Most repositories accepted by one POST /repositories/analyze-bulk/
+BULK_ANALYZE_MAX_REPOSITORIES = config('BULK_ANALYZE_MAX_REPOSITORIES', default=500, cast=int)
+
+# How often the in-memory "similar repositories" index picks up newly completed analyses
+SIMILARITY_REFRESH_SECONDS = config('SIMILARITY_REFRESH_SECONDS', default=30.0, cast=float)
+
+# Most repositories one POST /repositories/analyze-owner/ sweep may queue
+SWEEP_MAX_REPOSITORIES = config('SWEEP_MAX_REPOSITORIES', default=2000, cast=int)
+
+# Longest a /analyses/{id}/events stream stays open; EventSource reconnects after
+ANALYSIS_EVENTS_MAX_SECONDS = config('ANALYSIS_EVENTS_MAX_SECONDS', default=600.0, cast=float)
+
+# Store structure-based heuristic scores when the Z AI call fails (provider down,
+# over budget, malformed response) instead of failing the analysis
+HEURISTIC_FALLBACK_ENABLED = config('HEURISTIC_FALLBACK_ENABLED', default=True, cast=bool)
+
+# Repositories per request for offline re-scoring (manage.py rescore_repositories)
+ZAI_BATCH_SIZE = config('ZAI_BATCH_SIZE', default=10, cast=int)
+
+# Stream Z AI completions and persist each result section as soon as it is complete
+ZAI_STREAMING = config('ZAI_STREAMING', default=False, cast=bool)
+
+# Content-addressed cache of Z AI completions (keyed on model, prompts and parameters)
+LLM_CACHE_ENABLED = config('LLM_CACHE_ENABLED', default=True, cast=bool)
+LLM_CACHE_DIR = config('LLM_CACHE_DIR', default=os.path.join(CACHE_ROOT, 'llm'))
+LLM_CACHE_TTL_SECONDS = config('LLM_CACHE_TTL_SECONDS', default=7 * 24 * 3600, cast=int)
+LLM_CACHE_MAX_BYTES = config('LLM_CACHE_MAX_BYTES', default=64 * 1024 * 1024, cast=int)
+
 # CORS settings - Allow specific origins without paths
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-17 23:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personalities', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='personality',
+            index=models.Index(fields=['created_at', 'id'], name='personaliti_created_ed0ac1_idx'),
+        ),
+    ]
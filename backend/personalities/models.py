@@ -42,6 +42,7 @@ class Personality(models.Model):
         indexes = [
             models.Index(fields=['analysis']),
             models.Index(fields=['complexity_score', 'creativity_score']),
+            models.Index(fields=['created_at', 'id']),  # Keyset pagination
         ]
 
     def __str__(self):
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-17 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositories', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='repository',
+            index=models.Index(fields=['created_at', 'id'], name='repositorie_created_e98868_idx'),
+        ),
+    ]
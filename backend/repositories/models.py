@@ -29,6 +29,7 @@ class Repository(models.Model):
             models.Index(fields=['platform']),
             models.Index(fields=['owner']),
             models.Index(fields=['language']),
+            models.Index(fields=['created_at', 'id']),  # Keyset pagination
         ]
 
     def __str__(self):
@@ -170,7 +170,19 @@ echo '{
 }'
 
 echo ""
-echo "4. Testing Error Handling"
+echo "4. Testing GET /api/v1/analyses/{id}/result"
+echo "---------------------------------------------"
+
+echo "Command to run:"
+echo "curl -X GET '${API_BASE}/analyses/${ANALYSIS_ID}/result/'"
+echo ""
+
+echo "Expected response (200 OK): the analysis status response (step 2) with a"
+echo "\"personality\" key holding the personality response (step 3), or null"
+echo "while the analysis is still running"
+
+echo ""
+echo "5. Testing Error Handling"
 echo "-------------------------"
 
 echo "Test 1: Missing repository URL"